@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -102,6 +103,27 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 DND_API_URL = os.getenv('DND_API_URL', 'https://www.dnd5eapi.co/api/2014')
+DND_API_TIMEOUT = int(os.getenv('DND_API_TIMEOUT', '10'))
+DND_API_MAX_RETRIES = int(os.getenv('DND_API_MAX_RETRIES', '3'))
+DND_API_BACKOFF = float(os.getenv('DND_API_BACKOFF', '0.5'))
+DND_API_POOL_SIZE = int(os.getenv('DND_API_POOL_SIZE', '10'))
+DND_API_CACHE_DIR = os.getenv('DND_API_CACHE_DIR', str(BASE_DIR / 'dnd_api_cache'))
+DND_API_CACHE_MAX_AGE = int(os.getenv('DND_API_CACHE_MAX_AGE', '86400'))
+DND_API_RATE_LIMIT = float(os.getenv('DND_API_RATE_LIMIT', '20'))
+DND_API_TARGET_LATENCY = float(os.getenv('DND_API_TARGET_LATENCY', '2'))
+DND_API_OFFLINE = os.getenv('DND_API_OFFLINE', 'False').lower() in ('true', '1', 't')
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'django_cache')),
+    }
+}
+LIST_CACHE_TIMEOUT = int(os.getenv('LIST_CACHE_TIMEOUT', '600'))
+LIST_PAGINATION = os.getenv('LIST_PAGINATION', 'offset')
+LIST_COUNT_ESTIMATE_THRESHOLD = int(os.getenv('LIST_COUNT_ESTIMATE_THRESHOLD', '1000'))
+
+MONSTER_SIMILARITY_WEIGHTS = json.loads(os.getenv('MONSTER_SIMILARITY_WEIGHTS', '{}'))
 
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
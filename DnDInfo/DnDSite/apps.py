@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class DndsiteConfig(AppConfig):
     name = 'DnDSite'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -129,6 +129,7 @@ SORT_OPTIONS_EQUIPMENTS = [
         ('weight_desc', 'Вес ↓'),
         ('price_asc', 'Цена ↑'),
         ('price_desc', 'Цена ↓'),
+        ('relevance', 'По релевантности'),
     ]
 
 SCHOOL_MAPPING = {
@@ -157,6 +158,7 @@ SORT_OPTIONS_SPELLS = [
     ('name', 'По названию'),
     ('level', 'По уровню'),
     ('school', 'По школе'),
+    ('relevance', 'По релевантности'),
 ]
 
 COMPONENT_MAPPING = {'V': 'V', 'S': 'S', 'M': 'M'}
@@ -204,6 +206,7 @@ SORT_OPTIONS = [
         ('intelligence', 'По интеллекту'),
         ('wisdom', 'По мудрости'),
         ('charisma', 'По харизме'),
+        ('relevance', 'По релевантности'),
     ]
 
 SPECIAL_CASES = {
@@ -0,0 +1,56 @@
+import logging
+
+from django.db import transaction
+
+from .list_cache import ListResultCache
+from .search import SearchIndex, NameSuggester, Autocomplete
+from .similarity import SimilarItemsTable, EquipmentTokenIndex, MonsterNeighbors
+
+logger = logging.getLogger(__name__)
+
+
+class DerivedIndexes:
+    @staticmethod
+    def _run(content_type, steps):
+        for step in steps:
+            try:
+                step()
+            except Exception as e:
+                logger.error(f"Ошибка при обновлении индексов {content_type}: {e}")
+
+    @classmethod
+    def after_commit(cls, content_type, *steps):
+        transaction.on_commit(lambda: cls._run(content_type, steps))
+
+    @classmethod
+    def invalidate(cls, content_type, objects=(), removed_ids=()):
+        versions = ListResultCache.bump(content_type)
+        cls._run(content_type, [
+            lambda: NameSuggester.update(content_type, versions, objects, removed_ids),
+            lambda: Autocomplete.update(content_type, versions, objects, removed_ids),
+        ])
+
+    @classmethod
+    def saved(cls, content_type, objects):
+        objects = [obj for obj in objects if obj.id is not None]
+        object_ids = [obj.id for obj in objects]
+        steps = [lambda: SearchIndex.index_objects(content_type, objects)]
+        if content_type == 'equipment':
+            steps.append(lambda: EquipmentTokenIndex.update(objects))
+        if content_type in SimilarItemsTable.ENGINES:
+            steps.append(lambda: SimilarItemsTable.refresh_objects(content_type, object_ids))
+        if content_type == 'monster':
+            steps.append(lambda: MonsterNeighbors.update(object_ids))
+        steps.append(lambda: cls.invalidate(content_type, objects=objects))
+        cls.after_commit(content_type, *steps)
+
+    @classmethod
+    def removed(cls, content_type, object_ids):
+        object_ids = list(object_ids)
+        steps = [lambda: SearchIndex.remove(content_type, object_ids)]
+        if content_type in SimilarItemsTable.ENGINES:
+            steps.append(lambda: SimilarItemsTable.refresh_objects(content_type, object_ids))
+        if content_type == 'monster':
+            steps.append(lambda: MonsterNeighbors.update(object_ids))
+        steps.append(lambda: cls.invalidate(content_type, removed_ids=object_ids))
+        cls.after_commit(content_type, *steps)
\ No newline at end of file
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+
+from .models import normalize_text
+
+
+class CachedPage:
+    def __init__(self, model, ids):
+        self.model = model
+        self.ids = ids
+
+    def count(self):
+        return len(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, page):
+        ids = self.ids[page]
+        objects = self.model.objects.in_bulk(ids)
+        return [objects[object_id] for object_id in ids if object_id in objects]
+
+
+class ListResultCache:
+    @staticmethod
+    def _version_key(content_type):
+        return f'dndsite:list-version:{content_type}'
+
+    @classmethod
+    def version(cls, content_type):
+        key = cls._version_key(content_type)
+        version = cache.get(key)
+        if version is None:
+            version = time.time_ns()
+            if not cache.add(key, version, None):
+                version = cache.get(key, version)
+        return version
+
+    @classmethod
+    def bump(cls, content_type):
+        key = cls._version_key(content_type)
+        try:
+            version = cache.incr(key)
+            cache.touch(key, None)
+        except ValueError:
+            version = time.time_ns()
+            cache.set(key, version, None)
+            return None, version
+        return version - 1, version
+
+    @staticmethod
+    def signature(params):
+        normalized = {
+            name: ' '.join(normalize_text(str(value)).split())
+            for name, value in params.items()
+        }
+        return hashlib.sha1(json.dumps(normalized, sort_keys=True).encode('utf-8')).hexdigest()
+
+    @classmethod
+    def results(cls, content_type, params, queryset, threshold=None):
+        key = f'dndsite:list:{content_type}:{cls.version(content_type)}:{cls.signature(params)}'
+        ids = cache.get(key)
+        if ids is None:
+            ids = queryset.values_list('id', flat=True)
+            ids = list(ids[:threshold + 1] if threshold else ids)
+            if threshold and len(ids) > threshold:
+                ids = False
+            cache.set(key, ids, settings.LIST_CACHE_TIMEOUT)
+        if ids is False:
+            return None
+        return CachedPage(queryset.model, ids)
+
+    @classmethod
+    def cached(cls, content_type, name, compute):
+        key = f'dndsite:{name}:{content_type}:{cls.version(content_type)}'
+        value = cache.get(key)
+        if value is None:
+            value = compute()
+            cache.set(key, value, settings.LIST_CACHE_TIMEOUT)
+        return value
+
+    @staticmethod
+    def estimate_count(queryset, threshold):
+        sample = list(queryset.order_by('id').values_list('id', flat=True)[:threshold + 1])
+        if len(sample) <= threshold:
+            return len(sample), False
+        last_id = queryset.order_by().aggregate(last_id=Max('id'))['last_id']
+        density = len(sample) / (sample[-1] - sample[0] + 1)
+        return max(round(density * (last_id - sample[0] + 1)), len(sample)), True
+
+    @classmethod
+    def count(cls, content_type, params, queryset, threshold=None):
+        key = f'dndsite:count:{content_type}:{cls.version(content_type)}:{cls.signature(params)}'
+        cached = cache.get(key)
+        if cached is None:
+            cached = cls.estimate_count(queryset, threshold) if threshold else (queryset.count(), False)
+            cache.set(key, cached, settings.LIST_CACHE_TIMEOUT)
+        return cached
\ No newline at end of file
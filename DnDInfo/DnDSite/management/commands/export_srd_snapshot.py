@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from DnDSite.snapshots import SrdSnapshot
+
+
+class Command(BaseCommand):
+    help = 'Выгружает официальные монстры, заклинания и снаряжение в сжатый NDJSON-снимок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу снимка (например, srd.ndjson.gz)')
+
+    def handle(self, *args, **options):
+        counts = SrdSnapshot().export(options['path'])
+
+        self.stdout.write(self.style.SUCCESS(f"Снимок сохранён: {options['path']}"))
+        self.stdout.write(self.style.SUCCESS(f"Монстров: {counts['monster']}"))
+        self.stdout.write(self.style.SUCCESS(f"Заклинаний: {counts['spell']}"))
+        self.stdout.write(self.style.SUCCESS(f"Снаряжения: {counts['equipment']}"))
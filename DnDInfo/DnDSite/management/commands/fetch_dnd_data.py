@@ -1,6 +1,7 @@
+import time
+
 from django.core.management.base import BaseCommand
-from django.db import transaction
-from DnDSite.utils import DataImporter
+from DnDSite.utils import DataImporter, DndApiClient
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,54 +13,90 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('--limit', type=int, default=20, help='Количество записей каждого типа для загрузки (по умолчанию: 20)'
         )
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Количество параллельных запросов к API (по умолчанию: 1 - последовательно)')
+        parser.add_argument('--offline', action='store_true',
+                            help='Использовать только сохранённые ответы API без обращения к сети')
+        parser.add_argument('--no-cache', action='store_true',
+                            help='Не использовать сохранённые ответы API (например, для замеров против serve_srd_fixtures)')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Количество записей, сохраняемых в базу одним пакетом (по умолчанию: 100)')
+        parser.add_argument('--sync', action='store_true',
+                            help='Обновлять существующие записи, если документ в API изменился')
+        parser.add_argument('--resume', action='store_true',
+                            help='Продолжить прерванную загрузку с последней контрольной точки')
+
+    def import_entities(self, importer, entity_type, get_list, limit, workers, batch_size, sync, resume):
+        indexes = [item['index'] for item in get_list()[:limit]]
+        stats = importer.import_many(entity_type, indexes, workers, batch_size, sync, resume)
+        if stats['resumed']:
+            self.stdout.write(f"  Уже загружено ранее: {stats['resumed']}")
+        self.stdout.write(
+            f"  Добавлено: {stats['inserted']}, обновлено: {stats['updated']}, "
+            f"без изменений: {stats['unchanged']}, пропущено: {stats['existing']}, ошибок: {stats['failed']}"
+        )
+        return stats['inserted'] + stats['updated'] + stats['unchanged'] + stats['existing']
 
     def handle(self, *args, **options):
         limit = options['limit']
-        importer = DataImporter()
+        workers = max(options['workers'], 1)
+        batch_size = max(options['batch_size'], 1)
+        sync = options['sync']
+        resume = options['resume']
+        importer = DataImporter(DndApiClient(
+            pool_size=workers,
+            offline=options['offline'] or None,
+            cache_dir='' if options['no_cache'] else None,
+        ))
+        api_client = importer.api_client
 
         self.stdout.write(self.style.SUCCESS('Начинаем загрузку данных из D&D 5e API...'))
+        if workers > 1:
+            self.stdout.write(f'Параллельных запросов: {workers}')
+        if sync:
+            self.stdout.write('Режим синхронизации: изменённые записи будут обновлены')
+        if resume:
+            self.stdout.write('Продолжение с последней контрольной точки')
+        started = time.monotonic()
 
         try:
-            with transaction.atomic():
-                self.stdout.write('Загрузка монстров')
-                monsters = importer.api_client.get_monsters_list()[:limit]
-                monster_count = 0
-
-                for monster_data in monsters:
-                    monster = importer.import_monster(monster_data['index'])
-                    if monster:
-                        monster_count += 1
-
-                self.stdout.write(self.style.SUCCESS(f'Загружено монстров: {monster_count}'))
-
-                self.stdout.write('Загрузка заклинаний')
-                spells = importer.api_client.get_spells_list()[:limit]
-                spell_count = 0
-
-                for spell_data in spells:
-                    spell = importer.import_spell(spell_data['index'])
-                    if spell:
-                        spell_count += 1
-
-                self.stdout.write(self.style.SUCCESS(f'Загружено заклинаний: {spell_count}'))
-
-                self.stdout.write('Загрузка снаряжения')
-                equipment_list = importer.api_client.get_equipment_list()[:limit]
-                equipment_count = 0
-
-                for equipment_data in equipment_list:
-                    equipment = importer.import_equipment(equipment_data['index'])
-                    if equipment:
-                        equipment_count += 1
-
-                self.stdout.write(self.style.SUCCESS(f'Загружено снаряжения: {equipment_count}'))
-
-                self.stdout.write(self.style.SUCCESS('ИТОГ ЗАГРУЗКИ:'))
-                self.stdout.write(self.style.SUCCESS(f'Монстров: {monster_count}'))
-                self.stdout.write(self.style.SUCCESS(f'Заклинаний: {spell_count}'))
-                self.stdout.write(self.style.SUCCESS(f'Снаряжения: {equipment_count}'))
-                self.stdout.write(self.style.SUCCESS(f'Всего записей: {monster_count + spell_count + equipment_count}'))
-
+            self.stdout.write('Загрузка монстров')
+            monster_count = self.import_entities(
+                importer, 'monster', api_client.get_monsters_list, limit, workers, batch_size, sync, resume
+            )
+            self.stdout.write(self.style.SUCCESS(f'Загружено монстров: {monster_count}'))
+
+            self.stdout.write('Загрузка заклинаний')
+            spell_count = self.import_entities(
+                importer, 'spell', api_client.get_spells_list, limit, workers, batch_size, sync, resume
+            )
+            self.stdout.write(self.style.SUCCESS(f'Загружено заклинаний: {spell_count}'))
+
+            self.stdout.write('Загрузка снаряжения')
+            equipment_count = self.import_entities(
+                importer, 'equipment', api_client.get_equipment_list, limit, workers, batch_size, sync, resume
+            )
+            self.stdout.write(self.style.SUCCESS(f'Загружено снаряжения: {equipment_count}'))
+
+            total_count = monster_count + spell_count + equipment_count
+            elapsed = time.monotonic() - started
+            self.stdout.write(self.style.SUCCESS('ИТОГ ЗАГРУЗКИ:'))
+            self.stdout.write(self.style.SUCCESS(f'Монстров: {monster_count}'))
+            self.stdout.write(self.style.SUCCESS(f'Заклинаний: {spell_count}'))
+            self.stdout.write(self.style.SUCCESS(f'Снаряжения: {equipment_count}'))
+            self.stdout.write(self.style.SUCCESS(f'Всего записей: {total_count}'))
+            self.stdout.write(self.style.SUCCESS(
+                f'Время: {elapsed:.1f} с, скорость: {total_count / elapsed if elapsed else 0:.1f} записей/с'
+            ))
+            if api_client.rate_limiter:
+                limiter_stats = api_client.rate_limiter.stats()
+                self.stdout.write(
+                    f"Ограничение запросов: {limiter_stats['rate']:.1f} запр./с, "
+                    f"параллельность {limiter_stats['concurrency']}, ответов 429: {limiter_stats['throttled']}"
+                )
+
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Загрузка прервана. Для продолжения запустите команду с --resume'))
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Ошибка при загрузке данных: {e}'))
             logger.error(f'Ошибка при загрузке данных: {e}')
\ No newline at end of file
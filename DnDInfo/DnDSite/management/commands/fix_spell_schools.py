@@ -1,7 +1,9 @@
 # DnDSite/management/commands/fix_spell_schools.py
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from ...models import Spell
-import requests
+from ...utils import DataImporter, DndApiClient
+from ...indexing import DerivedIndexes
 import logging
 
 from ...constants import SPECIAL_CASES, SCHOOL_MAPPING
@@ -18,6 +20,17 @@ class Command(BaseCommand):
             default=0,
             help='Количество заклинаний для обновления (0 - все)'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Количество параллельных запросов к API'
+        )
+        parser.add_argument(
+            '--offline',
+            action='store_true',
+            help='Использовать только сохранённые ответы API без обращения к сети'
+        )
 
     def get_spell_index_from_name(self, name):
         index = name.lower()
@@ -39,96 +52,52 @@ class Command(BaseCommand):
         return index
 
     def handle(self, *args, **options):
-        base_url = 'https://www.dnd5eapi.co/api/2014'
+        workers = max(options['workers'], 1)
+        importer = DataImporter(DndApiClient(pool_size=workers, offline=options['offline'] or None))
+        api_client = importer.api_client
         spells = Spell.objects.all()
 
         if options['limit'] > 0:
             spells = spells[:options['limit']]
-
-        updated_count = 0
-        total_spells = spells.count()
-        processed = 0
-
+        spells = list(spells)
+        total_spells = len(spells)
+
+        name_to_index = {item['name'].lower(): item['index'] for item in api_client.get_spells_list()}
+        spell_indexes = {
+            spell.id: name_to_index.get(spell.name.lower()) or self.get_spell_index_from_name(spell.name)
+            for spell in spells
+        }
+        indexes = list(dict.fromkeys(spell_indexes.values()))
+
+        schools = {}
+        fetched = importer.fetch_details(api_client.get_spell_detail, indexes, workers)
+        for processed, (index, data) in enumerate(fetched, 1):
+            self.stdout.write(f"[{processed}/{len(indexes)}] Загружено: {index}")
+            if data and 'school' in data:
+                schools[index] = data['school'].get('index', '')
+
+        changed_spells = []
         for spell in spells:
-            try:
-                processed += 1
-                self.stdout.write(f"[{processed}/{total_spells}] Обработка: {spell.name}")
-
-                index = self.get_spell_index_from_name(spell.name)
-                url = f"{base_url}/spells/{index}"
-                response = requests.get(url, timeout=10)
-
-                if response.status_code == 200:
-                    data = response.json()
-
-                    if 'school' in data:
-                        school_data = data['school']
-                        school_key = school_data.get('index', '')
-
-                        school_mapping = SCHOOL_MAPPING
-
-                        new_school = school_mapping.get(school_key, spell.school)
-
-                        if spell.school != new_school:
-                            spell.school = new_school
-                            spell.save()
-                            updated_count += 1
-                            self.stdout.write(
-                                self.style.SUCCESS(f"Обновлено: {spell.name} -> {new_school}")
-                            )
-                        else:
-                            self.stdout.write(
-                                self.style.WARNING(f"Без изменений: {spell.name} уже {spell.get_school_display()}")
-                            )
-                    else:
-                        self.stdout.write(
-                            self.style.ERROR(f"Нет данных о школе: {spell.name}")
-                        )
-                else:
-                    self.stdout.write(
-                        self.style.WARNING(f"Не найдено напрямую (статус {response.status_code}): {spell.name}")
-                    )
-                    try:
-                        list_url = f"{base_url}/spells"
-                        list_response = requests.get(list_url, timeout=10)
-
-                        if list_response.status_code == 200:
-                            all_spells = list_response.json().get('results', [])
-
-                            found_spell = None
-                            for api_spell in all_spells:
-                                if api_spell['name'].lower() == spell.name.lower():
-                                    found_spell = api_spell
-                                    break
-
-                            if found_spell:
-                                spell_index = found_spell['index']
-                                detail_url = f"{base_url}/spells/{spell_index}"
-                                detail_response = requests.get(detail_url, timeout=10)
-
-                                if detail_response.status_code == 200:
-                                    detail_data = detail_response.json()
-                                    if 'school' in detail_data:
-                                        school_key = detail_data['school'].get('index', '')
-                                        new_school = school_mapping.get(school_key, spell.school)
-
-                                        if spell.school != new_school:
-                                            spell.school = new_school
-                                            spell.save()
-                                            updated_count += 1
-                                            self.stdout.write(
-                                                self.style.SUCCESS(
-                                                    f"Обновлено через поиск: {spell.name} -> {new_school}")
-                                            )
-                    except Exception as e:
-                        logger.error(f"Ошибка при поиске {spell.name}: {e}")
-
-            except Exception as e:
-                logger.error(f"Ошибка при обновлении заклинания {spell.name}: {e}")
-                self.stdout.write(
-                    self.style.ERROR(f"Ошибка для {spell.name}: {str(e)}")
-                )
+            index = spell_indexes[spell.id]
+            if index not in schools:
+                self.stdout.write(self.style.WARNING(f"Нет данных о школе: {spell.name}"))
+                continue
+
+            new_school = SCHOOL_MAPPING.get(schools[index], spell.school)
+            if spell.school != new_school:
+                spell.school = new_school
+                changed_spells.append(spell)
+                self.stdout.write(self.style.SUCCESS(f"Обновлено: {spell.name} -> {new_school}"))
+
+        try:
+            with transaction.atomic():
+                Spell.objects.bulk_update(changed_spells, ['school'], batch_size=500)
+                DerivedIndexes.saved('spell', changed_spells)
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении школ заклинаний: {e}")
+            self.stdout.write(self.style.ERROR(f"Ошибка при сохранении: {e}"))
+            return
 
         self.stdout.write(
-            self.style.SUCCESS(f'\nГотово! Обновлено {updated_count} из {total_spells} заклинаний')
+            self.style.SUCCESS(f'\nГотово! Обновлено {len(changed_spells)} из {total_spells} заклинаний')
         )
\ No newline at end of file
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from DnDSite.snapshots import SrdSnapshot
+
+
+class Command(BaseCommand):
+    help = 'Загружает в базу данных снимок SRD, созданный командой export_srd_snapshot'
+
+    LABELS = {
+        'monster': 'Монстры',
+        'spell': 'Заклинания',
+        'equipment': 'Снаряжение',
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу снимка')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Количество записей, сохраняемых в базу одним пакетом (по умолчанию: 500)')
+        parser.add_argument('--sync', action='store_true',
+                            help='Обновлять существующие записи, если они отличаются от снимка')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            stats = SrdSnapshot().load(options['path'], max(options['batch_size'], 1), options['sync'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Не удалось загрузить снимок: {e}')
+
+        total_count = 0
+        for entity_type, label in self.LABELS.items():
+            entity_stats = stats.get(entity_type)
+            if not entity_stats:
+                continue
+            self.stdout.write(
+                f"{label}: добавлено {entity_stats['inserted']}, обновлено {entity_stats['updated']}, "
+                f"без изменений {entity_stats['unchanged']}, пропущено {entity_stats['existing']}, "
+                f"ошибок {entity_stats['failed']}"
+            )
+            total_count += sum(entity_stats.values())
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово! Обработано записей: {total_count} за {elapsed:.1f} с'
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from DnDSite.search import SearchIndex, SEARCH_MODELS
+from DnDSite.similarity import EquipmentTokenIndex
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает поисковые поля и перестраивает полнотекстовый индекс монстров, заклинаний и снаряжения'
+
+    def refresh_search_fields(self, model):
+        objects = list(model.objects.only('id', 'name', model.SEARCH_TEXT_FIELD))
+        for obj in objects:
+            obj.update_search_fields()
+        model.objects.bulk_update(objects, ['search_name', 'search_text'], batch_size=500)
+        return len(objects)
+
+    def handle(self, *args, **options):
+        for model in SEARCH_MODELS.values():
+            count = self.refresh_search_fields(model)
+            self.stdout.write(f'{model._meta.verbose_name_plural}: обновлено поисковых полей {count}')
+
+        count = EquipmentTokenIndex.rebuild()
+        self.stdout.write(f'Снаряжение: перестроен индекс токенов для {count} записей')
+
+        if not SearchIndex.is_available():
+            raise CommandError('Полнотекстовый индекс поддерживается только для SQLite с FTS5')
+
+        SearchIndex.rebuild()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен'))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from DnDSite.models import SimilarItem
+from DnDSite.similarity import SimilarItemsTable
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает таблицу похожих объектов для страниц с подробностями'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', choices=list(SimilarItemsTable.ENGINES), action='append',
+                            help='Тип контента для пересчёта (по умолчанию: все)')
+
+    def handle(self, *args, **options):
+        SimilarItem.objects.exclude(content_type__in=list(SimilarItemsTable.ENGINES)).delete()
+        for content_type in options['type'] or list(SimilarItemsTable.ENGINES):
+            started = time.monotonic()
+            count = SimilarItemsTable.refresh(content_type)
+            self.stdout.write(self.style.SUCCESS(
+                f'{content_type}: пересчитано {count} объектов за {time.monotonic() - started:.1f} с'
+            ))
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from DnDSite.srd_standin import SrdStandInServer
+
+
+class Command(BaseCommand):
+    help = ('Запускает локальную замену D&D 5e API, которая отдаёт сохранённые ответы '
+            'с настраиваемой задержкой и ошибками')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Адрес (по умолчанию: 127.0.0.1)')
+        parser.add_argument('--port', type=int, default=8765, help='Порт (по умолчанию: 8765)')
+        parser.add_argument('--fixtures', default=settings.DND_API_CACHE_DIR,
+                            help='Каталог с сохранёнными ответами API (по умолчанию: DND_API_CACHE_DIR)')
+        parser.add_argument('--prefix', default='/api/2014', help='Префикс пути API (по умолчанию: /api/2014)')
+        parser.add_argument('--latency', type=float, default=0.0, help='Задержка ответа в секундах')
+        parser.add_argument('--jitter', type=float, default=0.0, help='Случайный разброс задержки в секундах')
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help='Доля ответов с ошибкой 503 (от 0 до 1)')
+        parser.add_argument('--max-rps', type=int, default=0,
+                            help='Лимит запросов в секунду, сверх которого отдаётся 429 (0 - без лимита)')
+        parser.add_argument('--verbose', action='store_true', help='Печатать каждый запрос')
+
+    def handle(self, *args, **options):
+        server = SrdStandInServer(
+            (options['host'], options['port']),
+            options['fixtures'],
+            prefix=options['prefix'],
+            latency=options['latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            max_rps=options['max_rps'],
+            verbose=options['verbose'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Замена API запущена: http://{options['host']}:{options['port']}{server.prefix}"
+        ))
+        self.stdout.write(f"Задайте DND_API_URL=http://{options['host']}:{options['port']}{server.prefix}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f'Обработано запросов: {server.requests_total}')
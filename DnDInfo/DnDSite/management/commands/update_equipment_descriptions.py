@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from DnDSite.utils import DataImporter, DndApiClient
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Заполняет пустые описания официального снаряжения по данным из D&D 5e API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=50,
+                            help='Количество предметов для обновления (по умолчанию: 50)')
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Количество параллельных запросов к API (по умолчанию: 8)')
+        parser.add_argument('--offline', action='store_true',
+                            help='Использовать только сохранённые ответы API без обращения к сети')
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        importer = DataImporter(DndApiClient(pool_size=workers, offline=options['offline'] or None))
+
+        def progress(processed, total, index):
+            self.stdout.write(f"[{processed}/{total}] Загружено: {index}")
+
+        try:
+            updated_count = importer.update_equipment_descriptions(options['limit'], workers, progress)
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Ошибка при обновлении описаний: {e}'))
+            logger.error(f'Ошибка при обновлении описаний: {e}')
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'Готово! Обновлено описаний: {updated_count}'))
@@ -7,7 +7,34 @@ from django.utils.safestring import mark_safe
 from .constants import *
 
 
-class Monster(models.Model):
+def normalize_text(text):
+    return (text or '').lower().replace('ё', 'е')
+
+
+class SearchableModel(models.Model):
+    SEARCH_TEXT_FIELD = None
+
+    search_name = models.CharField(max_length=50, db_index=True, editable=False, default='')
+    search_text = models.TextField(editable=False, default='')
+
+    class Meta:
+        abstract = True
+
+    def update_search_fields(self):
+        self.search_name = normalize_text(self.name)
+        self.search_text = normalize_text(getattr(self, self.SEARCH_TEXT_FIELD))
+
+    def save(self, *args, **kwargs):
+        self.update_search_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'search_name', 'search_text'}
+        super().save(*args, **kwargs)
+
+
+class Monster(SearchableModel):
+    SEARCH_TEXT_FIELD = 'type'
+
     name = models.CharField("Название", max_length=50)
     size = models.TextField("Размер")
     type = models.TextField("Тип")
@@ -32,7 +59,8 @@ class Monster(models.Model):
         prefix = "[Homebrew] " if self.is_homebrew else ""
         return f"{prefix}{self.name}"
 
-class Spell(models.Model):
+class Spell(SearchableModel):
+    SEARCH_TEXT_FIELD = 'desc'
     LEVEL_COLORS = LEVEL_COLORS
     @property
     def is_cantrip(self):
@@ -57,7 +85,9 @@ class Spell(models.Model):
         verbose_name = 'Заклинание'
         verbose_name_plural = 'Заклинания'
 
-class Equipment(models.Model):
+class Equipment(SearchableModel):
+    SEARCH_TEXT_FIELD = 'description'
+
     def get_short_info_html(self):
         info = self.get_short_info()
         return mark_safe(f'<small class="text-muted">{info}</small>')
@@ -169,4 +199,65 @@ class Favorite(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"{self.user.username} - {self.get_content_type_display()} #{self.object_id}"
\ No newline at end of file
+        return f"{self.user.username} - {self.get_content_type_display()} #{self.object_id}"
+
+
+class ImportedRecord(models.Model):
+    content_type = models.CharField(max_length=20, choices=CONTENT_TYPES, verbose_name="Тип контента")
+    source_index = models.CharField("Индекс в API", max_length=100)
+    object_id = models.PositiveIntegerField(verbose_name="ID объекта")
+    content_hash = models.CharField("Хэш документа", max_length=64)
+    updated_at = models.DateTimeField("Обновлено", auto_now=True)
+
+    class Meta:
+        verbose_name = 'Импортированная запись'
+        verbose_name_plural = 'Импортированные записи'
+        unique_together = ['content_type', 'source_index']
+
+    def __str__(self):
+        return f"{self.get_content_type_display()} {self.source_index}"
+
+
+class ImportCheckpoint(models.Model):
+    content_type = models.CharField(max_length=20, choices=CONTENT_TYPES, verbose_name="Тип контента")
+    source_index = models.CharField("Индекс в API", max_length=100)
+    created_at = models.DateTimeField("Загружено", auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Контрольная точка импорта'
+        verbose_name_plural = 'Контрольные точки импорта'
+        unique_together = ['content_type', 'source_index']
+
+    def __str__(self):
+        return f"{self.get_content_type_display()} {self.source_index}"
+
+
+class SimilarItem(models.Model):
+    content_type = models.CharField(max_length=20, choices=CONTENT_TYPES, verbose_name="Тип контента")
+    source_id = models.PositiveIntegerField(verbose_name="ID объекта")
+    target_id = models.PositiveIntegerField(verbose_name="ID похожего объекта")
+    score = models.FloatField("Сходство")
+    rank = models.PositiveSmallIntegerField("Позиция")
+
+    class Meta:
+        verbose_name = 'Похожий объект'
+        verbose_name_plural = 'Похожие объекты'
+        unique_together = ['content_type', 'source_id', 'rank']
+        indexes = [models.Index(fields=['content_type', 'target_id'])]
+
+    def __str__(self):
+        return f"{self.get_content_type_display()} {self.source_id} → {self.target_id}"
+
+
+class EquipmentToken(models.Model):
+    equipment = models.ForeignKey(Equipment, on_delete=models.CASCADE, related_name='tokens', verbose_name="Снаряжение")
+    token = models.CharField("Токен", max_length=50)
+
+    class Meta:
+        verbose_name = 'Токен снаряжения'
+        verbose_name_plural = 'Токены снаряжения'
+        unique_together = ['equipment', 'token']
+        indexes = [models.Index(fields=['token', 'equipment'])]
+
+    def __str__(self):
+        return f"{self.token} → {self.equipment_id}"
\ No newline at end of file
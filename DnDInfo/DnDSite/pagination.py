@@ -0,0 +1,187 @@
+import base64
+import binascii
+import json
+import math
+from decimal import Decimal
+
+from django.core.paginator import Paginator, Page, EmptyPage, PageNotAnInteger
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    def __init__(self, object_list, per_page, count, count_is_estimated=False, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = count
+        self.count_is_estimated = count_is_estimated
+
+    def validate_number(self, number):
+        if not self.count_is_estimated:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы должен быть целым числом')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        return number
+
+    def page(self, number):
+        if not self.count_is_estimated:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        objects = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not objects and number > 1:
+            raise EmptyPage('На этой странице нет результатов')
+        return EstimatedPage(objects[:self.per_page], number, self, len(objects) > self.per_page)
+
+    def get_page(self, number):
+        if not self.count_is_estimated:
+            return super().get_page(number)
+        try:
+            return self.page(number)
+        except (PageNotAnInteger, EmptyPage):
+            return self.page(1)
+
+
+class EstimatedPage(Page):
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class KeysetPaginator:
+    def __init__(self, queryset, per_page, ordering, count=None, count_is_estimated=False):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = [*ordering, 'id']
+        self.count_is_estimated = count_is_estimated
+        if count is not None:
+            self.count = count
+
+    @cached_property
+    def count(self):
+        return self.queryset.count()
+
+    @property
+    def num_pages(self):
+        return max(math.ceil(self.count / self.per_page), 1)
+
+    @staticmethod
+    def encode_cursor(values, direction, number):
+        payload = json.dumps({'k': values, 'd': direction, 'p': number}, default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            values, direction, number = data['k'], data['d'], int(data['p'])
+        except (ValueError, KeyError, TypeError, binascii.Error):
+            return None
+        if direction not in ('next', 'previous') or len(values) != len(self.ordering) or number < 1:
+            return None
+        return values, direction, number
+
+    @staticmethod
+    def _field(name):
+        return name.lstrip('-'), name.startswith('-')
+
+    def _order_by(self, reverse):
+        expressions = []
+        for name in self.ordering:
+            field, descending = self._field(name)
+            if descending != reverse:
+                expressions.append(F(field).desc(nulls_last=True))
+            else:
+                expressions.append(F(field).asc(nulls_first=True))
+        return expressions
+
+    def _after(self, field, descending, value):
+        if value is None:
+            return Q(pk__in=[]) if descending else Q(**{f'{field}__isnull': False})
+        if descending:
+            return Q(**{f'{field}__lt': value}) | Q(**{f'{field}__isnull': True})
+        return Q(**{f'{field}__gt': value})
+
+    def _seek(self, values, reverse):
+        condition = Q(pk__in=[])
+        equal = Q()
+        for name, value in zip(self.ordering, values):
+            field, descending = self._field(name)
+            condition |= equal & self._after(field, descending != reverse, value)
+            equal &= Q(**{f'{field}__isnull': True}) if value is None else Q(**{field: value})
+        return condition
+
+    def cursor_values(self, obj):
+        values = []
+        for name in self.ordering:
+            value = getattr(obj, self._field(name)[0])
+            values.append(str(value) if isinstance(value, Decimal) else value)
+        return values
+
+    def get_page(self, cursor=None):
+        decoded = self.decode_cursor(cursor) if cursor else None
+        values, direction, number = decoded or (None, 'next', 1)
+        reverse = direction == 'previous'
+
+        queryset = self.queryset.order_by(*self._order_by(reverse))
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, reverse))
+        objects = list(queryset[:self.per_page + 1])
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if reverse:
+            objects.reverse()
+            has_next, has_previous = True, has_more and number > 1
+        else:
+            has_next, has_previous = has_more, values is not None and number > 1
+        return KeysetPage(objects, number, self, has_next, has_previous)
+
+
+class KeysetPage:
+    is_keyset = True
+
+    def __init__(self, object_list, number, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<Page {self.number} (keyset)>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return ''
+        return self.paginator.encode_cursor(self.paginator.cursor_values(self.object_list[-1]), 'next', self.number + 1)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return ''
+        return self.paginator.encode_cursor(self.paginator.cursor_values(self.object_list[0]), 'previous', self.number - 1)
\ No newline at end of file
@@ -0,0 +1,505 @@
+import bisect
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.db import connection, transaction, DatabaseError
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .list_cache import ListResultCache
+from .models import Monster, Spell, Equipment, normalize_text
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'dndsite_search'
+
+SEARCH_MODELS = {
+    'monster': Monster,
+    'spell': Spell,
+    'equipment': Equipment,
+}
+
+FTS_COLUMNS = (
+    "content_type UNINDEXED, object_id UNINDEXED, visible UNINDEXED, name, body, "
+    "tokenize = 'unicode61 remove_diacritics 2'"
+)
+
+FTS_SCHEMA = f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({FTS_COLUMNS})"
+
+FTS_INSERT = (
+    f"INSERT INTO {FTS_TABLE} (rowid, content_type, object_id, visible, name, body) "
+    "VALUES (%s, %s, %s, %s, %s, %s)"
+)
+
+FTS_RANK = f"bm25({FTS_TABLE}, 0, 0, 0, 10.0, 1.0)"
+
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+TYPE_CODES = {
+    'monster': 1,
+    'spell': 2,
+    'equipment': 3,
+}
+
+RUSSIAN_ENDINGS = sorted([
+    'ами', 'ями', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ов', 'ев', 'ей', 'ой', 'ый', 'ий',
+    'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ам', 'ям', 'ах', 'ях', 'ом', 'ем', 'ую', 'юю',
+    'а', 'я', 'ы', 'и', 'е', 'о', 'у', 'ю', 'ь', 'й',
+], key=len, reverse=True)
+
+
+def fold_yo(text):
+    return (text or '').replace('ё', 'е').replace('Ё', 'Е')
+
+
+def highlight_html(text):
+    return mark_safe(
+        escape(text or '').replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
+    )
+
+
+def search_terms(query):
+    return re.findall(r'\w+', normalize_text(query))
+
+
+def stem_term(term):
+    if len(term) < 4 or not re.search('[а-я]', term):
+        return term
+    for ending in RUSSIAN_ENDINGS:
+        if term.endswith(ending) and len(term) - len(ending) >= 3:
+            return term[:-len(ending)]
+    return term
+
+
+class SearchIndex:
+    RETRY_INTERVAL = 60
+
+    _ready = set()
+    _failed = {}
+
+    @classmethod
+    def is_available(cls):
+        if connection.vendor != 'sqlite':
+            return False
+        database = connection.settings_dict['NAME']
+        if database in cls._ready:
+            return True
+        failed_at = cls._failed.get(database)
+        if failed_at is not None and time.monotonic() - failed_at < cls.RETRY_INTERVAL:
+            return False
+        try:
+            cls._ensure_table()
+        except DatabaseError as e:
+            logger.error(f"Полнотекстовый индекс недоступен: {e}")
+            cls._failed[database] = time.monotonic()
+            return False
+        cls._failed.pop(database, None)
+        cls._ready.add(database)
+        return True
+
+    @classmethod
+    def _ensure_table(cls):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            row = cursor.fetchone()
+            if row and row[0] == FTS_SCHEMA:
+                return
+            if row:
+                cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+            cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5({FTS_COLUMNS})")
+        cls.rebuild()
+
+    @staticmethod
+    def rowid(content_type, object_id):
+        return object_id * 4 + TYPE_CODES[content_type]
+
+    @classmethod
+    def _row(cls, content_type, object_id, name, body, is_homebrew, is_approved):
+        return (
+            cls.rowid(content_type, object_id),
+            content_type,
+            object_id,
+            int(not is_homebrew or is_approved),
+            fold_yo(name),
+            fold_yo(body),
+        )
+
+    @classmethod
+    def rebuild(cls):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            for content_type, model in SEARCH_MODELS.items():
+                rows = [
+                    cls._row(content_type, *values)
+                    for values in model.objects.values_list(
+                        'id', 'name', model.SEARCH_TEXT_FIELD, 'is_homebrew', 'is_approved'
+                    ).iterator()
+                ]
+                cursor.executemany(FTS_INSERT, rows)
+
+    @classmethod
+    def index_objects(cls, content_type, objects):
+        objects = [obj for obj in objects if obj.id is not None]
+        if not objects or not cls.is_available():
+            return
+        cls.remove(content_type, [obj.id for obj in objects])
+        with connection.cursor() as cursor:
+            cursor.executemany(FTS_INSERT, [
+                cls._row(
+                    content_type, obj.id, obj.name, getattr(obj, obj.SEARCH_TEXT_FIELD),
+                    obj.is_homebrew, obj.is_approved
+                )
+                for obj in objects
+            ])
+
+    @classmethod
+    def remove(cls, content_type, object_ids):
+        if not object_ids or not cls.is_available():
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+                [(cls.rowid(content_type, object_id),) for object_id in object_ids]
+            )
+
+    @staticmethod
+    def match_expression(query):
+        terms = dict.fromkeys(stem_term(term) for term in search_terms(query))
+        return ' OR '.join(f'"{term}"*' for term in terms)
+
+    @classmethod
+    def count_by_type(cls, query):
+        expression = cls.match_expression(query)
+        if not expression or not cls.is_available():
+            return {}
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT content_type, COUNT(*) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND visible = 1 GROUP BY content_type",
+                [expression]
+            )
+            return dict(cursor.fetchall())
+
+    @classmethod
+    def ranked(cls, query, content_type=None, offset=0, limit=20):
+        expression = cls.match_expression(query)
+        if not expression or not cls.is_available():
+            return []
+        conditions = [f"{FTS_TABLE} MATCH %s", "visible = 1"]
+        params = [HIGHLIGHT_START, HIGHLIGHT_END, HIGHLIGHT_START, HIGHLIGHT_END, expression]
+        if content_type:
+            conditions.append("content_type = %s")
+            params.append(content_type)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT content_type, object_id, {FTS_RANK}, "
+                f"highlight({FTS_TABLE}, 3, %s, %s), "
+                f"snippet({FTS_TABLE}, 4, %s, %s, '…', 24) "
+                f"FROM {FTS_TABLE} WHERE {' AND '.join(conditions)} "
+                f"ORDER BY {FTS_RANK} LIMIT %s OFFSET %s",
+                [*params, limit, offset]
+            )
+            return [
+                {
+                    'content_type': content_type,
+                    'object_id': object_id,
+                    'rank': rank,
+                    'name': highlight_html(name),
+                    'snippet': highlight_html(snippet),
+                }
+                for content_type, object_id, rank, name, snippet in cursor.fetchall()
+            ]
+
+    @classmethod
+    def filter_queryset(cls, queryset, content_type, query, by_rank=False):
+        if not cls.is_available():
+            return cls._fallback_filter(queryset, query)
+
+        expression = cls.match_expression(query)
+        if not expression:
+            return queryset
+        queryset = queryset.filter(id__in=RawSQL(
+            f"SELECT object_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND content_type = %s",
+            [expression, content_type]
+        ))
+        if by_rank:
+            table = queryset.model._meta.db_table
+            queryset = queryset.annotate(search_rank=RawSQL(
+                f"SELECT {FTS_RANK} FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = \"{table}\".\"id\" * 4 + %s",
+                [expression, TYPE_CODES[content_type]]
+            )).order_by('search_rank', 'name')
+        return queryset
+
+    @staticmethod
+    def _fallback_filter(queryset, query):
+        query_filter = Q()
+        for term in normalize_text(query).split():
+            query_filter |= Q(search_name__contains=term) | Q(search_text__contains=term)
+        return queryset.filter(query_filter)
+
+
+class SearchResults:
+    def __init__(self, query, content_type=None):
+        self.query = query
+        self.content_type = content_type
+        self.counts = SearchIndex.count_by_type(query)
+
+    def count(self):
+        if self.content_type:
+            return self.counts.get(self.content_type, 0)
+        return sum(self.counts.values())
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, page):
+        results = SearchIndex.ranked(self.query, self.content_type, page.start, page.stop - page.start)
+        for content_type in SEARCH_MODELS:
+            ids = [result['object_id'] for result in results if result['content_type'] == content_type]
+            objects = SEARCH_MODELS[content_type].objects.in_bulk(ids) if ids else {}
+            for result in results:
+                if result['content_type'] == content_type:
+                    result['object'] = objects.get(result['object_id'])
+        return [result for result in results if result['object'] is not None]
+
+
+def trigrams(text):
+    padded = f'  {normalize_text(text).strip()} '
+    return frozenset([padded[i:i + 3] for i in range(len(padded) - 2)])
+
+
+class TrigramIndex:
+    MAX_CANDIDATES = 200
+
+    def __init__(self, items=()):
+        self.names = {}
+        self.grams = {}
+        self.postings = defaultdict(set)
+        for object_id, name in items:
+            self.add(object_id, name)
+
+    @staticmethod
+    def _variants(name):
+        folded = normalize_text(name).strip()
+        variants = [trigrams(folded)]
+        for word in dict.fromkeys(re.findall(r'\w{3,}', folded)):
+            if word != folded:
+                variants.append(trigrams(word))
+        return variants
+
+    def add(self, object_id, name):
+        self.remove(object_id)
+        variants = self._variants(name)
+        self.names[object_id] = name
+        self.grams[object_id] = variants
+        for variant in variants:
+            for gram in variant:
+                self.postings[gram].add(object_id)
+
+    def remove(self, object_id):
+        variants = self.grams.pop(object_id, None)
+        if variants is None:
+            return
+        del self.names[object_id]
+        for variant in variants:
+            for gram in variant:
+                self.postings[gram].discard(object_id)
+
+    def similar(self, query, limit=5, threshold=0.3):
+        grams = trigrams(query)
+        if not grams:
+            return []
+        postings = sorted((self.postings[gram] for gram in grams if self.postings.get(gram)), key=len)
+        needed = max(math.ceil(threshold * len(grams)), 1)
+        skipped = max(needed - 2, 0)
+        counts = Counter()
+        for posting in postings[:len(postings) - skipped]:
+            counts.update(posting)
+        required = needed - skipped
+        candidates = [object_id for object_id, shared in counts.items() if shared >= required]
+        if len(candidates) > self.MAX_CANDIDATES:
+            candidates = heapq.nlargest(self.MAX_CANDIDATES, candidates, key=counts.__getitem__)
+
+        scores = {}
+        for object_id in candidates:
+            score = 0
+            for variant in self.grams[object_id]:
+                shared = len(grams & variant)
+                score = max(score, shared / (len(grams) + len(variant) - shared))
+            name = self.names[object_id]
+            if score >= threshold and score > scores.get(name, 0):
+                scores[name] = score
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+
+class NameSuggester:
+    CHECK_INTERVAL = 60
+
+    _indexes = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _queryset(content_type, homebrew):
+        queryset = SEARCH_MODELS[content_type].objects.filter(is_homebrew=homebrew)
+        if homebrew:
+            queryset = queryset.filter(is_approved=True)
+        return queryset
+
+    @classmethod
+    def _get_index(cls, content_type, homebrew):
+        key = (content_type, homebrew)
+        cached = cls._indexes.get(key)
+        if cached and time.monotonic() - cached['checked_at'] < cls.CHECK_INTERVAL:
+            return cached['index']
+        with cls._lock:
+            version = ListResultCache.version(content_type)
+            cached = cls._indexes.get(key)
+            if not cached or cached['version'] != version:
+                queryset = cls._queryset(content_type, homebrew)
+                cached = {'index': TrigramIndex(queryset.values_list('id', 'name').iterator()), 'version': version}
+            cached['checked_at'] = time.monotonic()
+            cls._indexes[key] = cached
+            return cached['index']
+
+    @classmethod
+    def update(cls, content_type, versions, objects=(), removed_ids=()):
+        previous, current = versions
+        with cls._lock:
+            for key, cached in list(cls._indexes.items()):
+                indexed_type, homebrew = key
+                if indexed_type != content_type:
+                    continue
+                if cached['version'] != previous:
+                    del cls._indexes[key]
+                    continue
+                index = cached['index']
+                for obj in objects:
+                    if obj.is_homebrew == homebrew and (not homebrew or obj.is_approved):
+                        index.add(obj.id, obj.name)
+                    else:
+                        index.remove(obj.id)
+                for object_id in removed_ids:
+                    index.remove(object_id)
+                cached['version'] = current
+
+    @classmethod
+    def similar(cls, content_type, query, homebrew=False, limit=5):
+        if len(normalize_text(query).strip()) < 3:
+            return []
+        return cls._get_index(content_type, homebrew).similar(query, limit)
+
+    @classmethod
+    def suggest(cls, content_type, query, homebrew=False, limit=3):
+        return [
+            name for name, score in cls.similar(content_type, query, homebrew, limit + 1)
+            if normalize_text(name) != normalize_text(query)
+        ][:limit]
+
+
+class PrefixIndex:
+    def __init__(self, items=()):
+        self.keys = []
+        self.by_object = {}
+        entries = []
+        for object_id, name in items:
+            entries.extend(self._entries(object_id, name))
+        self.keys = sorted(entries)
+        for entry in self.keys:
+            self.by_object.setdefault(entry[2], []).append(entry)
+
+    @staticmethod
+    def _entries(object_id, name):
+        folded = normalize_text(name)
+        starts = [0] + [match.start() for match in re.finditer(r'(?<=[\s\-(])\w', folded)]
+        return [(folded[start:], name, object_id) for start in dict.fromkeys(starts)]
+
+    def add(self, object_id, name):
+        self.remove(object_id)
+        entries = self._entries(object_id, name)
+        for entry in entries:
+            bisect.insort(self.keys, entry)
+        self.by_object[object_id] = entries
+
+    def remove(self, object_id):
+        for entry in self.by_object.pop(object_id, []):
+            position = bisect.bisect_left(self.keys, entry)
+            if position < len(self.keys) and self.keys[position] == entry:
+                del self.keys[position]
+
+    def complete(self, prefix, limit=10):
+        prefix = normalize_text(prefix).lstrip()
+        if not prefix:
+            return []
+        results = {}
+        position = bisect.bisect_left(self.keys, (prefix,))
+        while position < len(self.keys) and len(results) < limit:
+            key, name, object_id = self.keys[position]
+            if not key.startswith(prefix):
+                break
+            results.setdefault(object_id, (key, name, object_id))
+            position += 1
+        return list(results.values())
+
+
+class Autocomplete:
+    CHECK_INTERVAL = 60
+
+    _indexes = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def _get_index(cls, content_type):
+        cached = cls._indexes.get(content_type)
+        if cached and time.monotonic() - cached['checked_at'] < cls.CHECK_INTERVAL:
+            return cached['index']
+        with cls._lock:
+            version = ListResultCache.version(content_type)
+            cached = cls._indexes.get(content_type)
+            if not cached or cached['version'] != version:
+                queryset = SEARCH_MODELS[content_type].objects.filter(Q(is_homebrew=False) | Q(is_approved=True))
+                cached = {'index': PrefixIndex(queryset.values_list('id', 'name').iterator()), 'version': version}
+            cached['checked_at'] = time.monotonic()
+            cls._indexes[content_type] = cached
+            return cached['index']
+
+    @classmethod
+    def update(cls, content_type, versions, objects=(), removed_ids=()):
+        previous, current = versions
+        with cls._lock:
+            cached = cls._indexes.get(content_type)
+            if not cached:
+                return
+            if cached['version'] != previous:
+                del cls._indexes[content_type]
+                return
+            index = cached['index']
+            for obj in objects:
+                if obj.is_homebrew and not obj.is_approved:
+                    index.remove(obj.id)
+                else:
+                    index.add(obj.id, obj.name)
+            for object_id in removed_ids:
+                index.remove(object_id)
+            cached['version'] = current
+
+    @classmethod
+    def complete(cls, prefix, content_type=None, limit=10):
+        content_types = [content_type] if content_type else list(SEARCH_MODELS)
+        matches = [
+            (key, name, match_type, object_id)
+            for match_type in content_types
+            for key, name, object_id in cls._get_index(match_type).complete(prefix, limit)
+        ]
+        return [
+            {'type': match_type, 'id': object_id, 'name': name}
+            for key, name, match_type, object_id in sorted(matches)[:limit]
+        ]
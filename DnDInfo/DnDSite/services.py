@@ -1,16 +1,19 @@
-from django.db.models import Q
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connection
 from django.urls import reverse
 
-from .models import Monster, Equipment, Spell
+from .list_cache import ListResultCache
+from .models import Monster, Equipment, Spell, normalize_text
+from .pagination import KeysetPaginator, EstimatedCountPaginator
+from .search import SearchIndex, NameSuggester, SEARCH_MODELS
+from .similarity import SimilarItemsTable, EquipmentTokenIndex, MonsterNeighbors
 
 
 class MonsterService:
     @staticmethod
     def get_similar_monsters(monster, limit=5):
-        similar = Monster.objects.filter(
-            Q(type__icontains=monster.type) | Q(size=monster.size)
-        ).exclude(id=monster.id)
-        return similar.order_by('-type', 'hit_points')[:limit]
+        return MonsterNeighbors.similar(monster, limit)
 
     @staticmethod
     def get_absolute_url(monster):
@@ -44,51 +47,13 @@ class SpellService:
 
     @staticmethod
     def get_similar_spells(spell, limit=5):
-        queries = Q()
-        queries |= Q(level=spell.level)
-        queries |= Q(school=spell.school)
-        name_words = [word for word in spell.name.split() if len(word) > 2]
-        for word in name_words[:3]:
-            queries |= Q(name__icontains=word)
-            queries |= Q(desc__icontains=word)
-
-        if spell.desc:
-            effect_keywords = [
-                'урон', 'лечение', 'щит', 'невидимость', 'полёт',
-                'телепортация', 'огонь', 'лёд', 'молния', 'кислота',
-                'яд', 'психический', 'сила', 'ловкость', 'интеллект'
-            ]
-            for keyword in effect_keywords:
-                if keyword in spell.desc.lower():
-                    queries |= Q(desc__icontains=keyword)
-
-        similar = Spell.objects.filter(queries).exclude(id=spell.id).distinct()
-        similar = similar.order_by(
-            '-level',
-            '-school',
-            'name'
-        )[:limit]
-
-        return similar
+        return SimilarItemsTable.similar('spell', spell, limit)
 
 
 class EquipmentService:
     @staticmethod
     def get_similar_equipment(equipment, limit=5):
-        similar = Equipment.objects.filter(
-            Q(name__icontains=equipment.name.split()[0]) |
-            Q(description__icontains=equipment.name.split()[0])
-        ).exclude(id=equipment.id)
-
-        if equipment.description:
-            keywords = equipment.description.split()[:10]
-            for keyword in keywords:
-                if len(keyword) > 3:
-                    similar = similar | Equipment.objects.filter(
-                        Q(description__icontains=keyword) |
-                        Q(name__icontains=keyword)
-                    ).exclude(id=equipment.id)
-        return similar.distinct()[:limit]
+        return EquipmentTokenIndex.similar(equipment, limit)
 
     @staticmethod
     def get_absolute_url(equipment):
@@ -139,4 +104,139 @@ class FavoriteService:
             'monster': 'Монстр',
             'spell': 'Заклинание',
             'equipment': 'Снаряжение',
+        }
+
+
+class CatalogListService:
+    PAGE_SIZES = {
+        'monster': 12,
+        'spell': 10,
+        'equipment': 12,
+    }
+
+    FILTERS = {
+        'monster': ('size', 'type'),
+        'spell': ('level', 'school'),
+        'equipment': ('cost_unit', 'weight_filter'),
+    }
+
+    ORDERINGS = {
+        'monster': {
+            'name': ['name'],
+            'hit_points': ['-hit_points'],
+            'strength': ['-strength'],
+            'dexterity': ['-dexterity'],
+            'constitution': ['-constitution'],
+            'intelligence': ['-intelligence'],
+            'wisdom': ['-wisdom'],
+            'charisma': ['-charisma'],
+        },
+        'spell': {
+            'name': ['name'],
+            'level': ['level', 'name'],
+            'school': ['school', 'level', 'name'],
+        },
+        'equipment': {
+            'name': ['name'],
+            'weight_asc': ['weight'],
+            'weight_desc': ['-weight'],
+            'price_asc': ['cost_quantity'],
+            'price_desc': ['-cost_quantity'],
+        },
+    }
+
+    WEIGHT_FILTERS = {
+        'light': {'weight__lt': 5},
+        'medium': {'weight__range': (5, 15)},
+        'heavy': {'weight__gt': 15},
+    }
+
+    @classmethod
+    def params_from_request(cls, content_type, request):
+        search_query = request.GET.get('search', '').strip()
+        params = {
+            'search': search_query,
+            'show_homebrew': request.GET.get('show_homebrew', 'false') == 'true',
+            'sort': request.GET.get('sort') or ('relevance' if search_query else 'name'),
+        }
+        for name in cls.FILTERS[content_type]:
+            params[name] = request.GET.get(name, '')
+        return params
+
+    @classmethod
+    def _filter_kwargs(cls, content_type, params):
+        kwargs = {}
+        if content_type == 'monster':
+            if params['size']:
+                kwargs['size'] = params['size']
+            if params['type']:
+                kwargs['search_text__contains'] = normalize_text(params['type'])
+        elif content_type == 'spell':
+            if params['level'].isdigit():
+                kwargs['level'] = int(params['level'])
+            if params['school']:
+                kwargs['school'] = params['school']
+        elif content_type == 'equipment':
+            if params['cost_unit']:
+                kwargs['cost_unit'] = params['cost_unit']
+            kwargs.update(cls.WEIGHT_FILTERS.get(params['weight_filter'], {}))
+        return kwargs
+
+    @classmethod
+    def build_queryset(cls, content_type, params):
+        model = SEARCH_MODELS[content_type]
+        if params['show_homebrew']:
+            queryset = model.objects.filter(is_homebrew=True, is_approved=True)
+        else:
+            queryset = model.objects.filter(is_homebrew=False)
+
+        by_rank = params['sort'] == 'relevance' and bool(params['search'])
+        if params['search']:
+            queryset = SearchIndex.filter_queryset(queryset, content_type, params['search'], by_rank=by_rank)
+        queryset = queryset.filter(**cls._filter_kwargs(content_type, params))
+        if by_rank:
+            return queryset
+        return queryset.order_by(*cls.ORDERINGS[content_type].get(params['sort'], ['name']))
+
+    @classmethod
+    def uses_keyset(cls, params):
+        return settings.LIST_PAGINATION == 'keyset' and not (params['sort'] == 'relevance' and params['search'])
+
+    @classmethod
+    def get_page(cls, content_type, params, page_number, cursor=None):
+        queries = []
+
+        def count_query(execute, sql, sql_params, many, context):
+            queries.append(sql)
+            return execute(sql, sql_params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            queryset = cls.build_queryset(content_type, params)
+            threshold = settings.LIST_COUNT_ESTIMATE_THRESHOLD
+            if cls.uses_keyset(params):
+                ordering = cls.ORDERINGS[content_type].get(params['sort'], ['name'])
+                count, estimated = ListResultCache.count(content_type, params, queryset, threshold)
+                paginator = KeysetPaginator(
+                    queryset, cls.PAGE_SIZES[content_type], ordering, count=count, count_is_estimated=estimated
+                )
+                page_obj = paginator.get_page(cursor)
+            else:
+                results = ListResultCache.results(content_type, params, queryset, threshold)
+                if results is not None:
+                    paginator = Paginator(results, cls.PAGE_SIZES[content_type])
+                else:
+                    count, estimated = ListResultCache.count(content_type, params, queryset, threshold)
+                    paginator = EstimatedCountPaginator(
+                        queryset, cls.PAGE_SIZES[content_type], count=count, count_is_estimated=estimated
+                    )
+                page_obj = paginator.get_page(page_number)
+            suggestions = []
+            if params['search'] and not paginator.count:
+                suggestions = NameSuggester.suggest(content_type, params['search'], params['show_homebrew'])
+
+        return {
+            'page_obj': page_obj,
+            'total_count': paginator.count,
+            'suggestions': suggestions,
+            'query_count': len(queries),
         }
\ No newline at end of file
@@ -0,0 +1,49 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Monster, Armor_class, Speed, Spell, Equipment
+from .indexing import DerivedIndexes
+from .similarity import MonsterNeighbors
+
+
+@receiver(post_save, sender=Monster)
+def index_monster(sender, instance, **kwargs):
+    DerivedIndexes.saved('monster', [instance])
+
+
+@receiver(post_save, sender=Spell)
+def index_spell(sender, instance, **kwargs):
+    DerivedIndexes.saved('spell', [instance])
+
+
+@receiver(post_save, sender=Equipment)
+def index_equipment(sender, instance, **kwargs):
+    DerivedIndexes.saved('equipment', [instance])
+
+
+@receiver(post_delete, sender=Monster)
+def unindex_monster(sender, instance, **kwargs):
+    DerivedIndexes.removed('monster', [instance.id])
+
+
+@receiver(post_delete, sender=Spell)
+def unindex_spell(sender, instance, **kwargs):
+    DerivedIndexes.removed('spell', [instance.id])
+
+
+@receiver(post_delete, sender=Equipment)
+def unindex_equipment(sender, instance, **kwargs):
+    DerivedIndexes.removed('equipment', [instance.id])
+
+
+@receiver(post_save, sender=Armor_class)
+@receiver(post_save, sender=Speed)
+@receiver(post_delete, sender=Armor_class)
+@receiver(post_delete, sender=Speed)
+def update_monster_profile(sender, instance, **kwargs):
+    monster_id = instance.monster_id
+    DerivedIndexes.after_commit(
+        'monster',
+        lambda: MonsterNeighbors.update([monster_id]),
+        lambda: DerivedIndexes.invalidate('monster'),
+    )
\ No newline at end of file
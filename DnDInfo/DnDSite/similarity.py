@@ -0,0 +1,452 @@
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min
+
+from .constants import SIZE_OPTIONS
+from .list_cache import ListResultCache
+from .models import Monster, Armor_class, Speed, Spell, Equipment, EquipmentToken, SimilarItem, normalize_text
+from .search import search_terms, stem_term
+
+logger = logging.getLogger(__name__)
+
+
+def text_tokens(text):
+    return [stem_term(term) for term in search_terms(text) if len(term) > 2 and not term.isdigit()]
+
+
+class TfidfIndex:
+    MAX_DF = 0.5
+
+    def __init__(self, documents):
+        self.tokens = {doc_id: Counter(text_tokens(text)) for doc_id, text in documents.items()}
+        self.document_frequency = Counter(term for counts in self.tokens.values() for term in counts)
+        self.vectors = {}
+        self.postings = defaultdict(dict)
+        for doc_id in self.tokens:
+            self._index(doc_id)
+
+    @classmethod
+    def weight(cls, size, frequency):
+        if size > 10 and frequency > cls.MAX_DF * size:
+            return 0.0
+        return math.log((1 + size) / (1 + frequency)) + 1
+
+    def idf(self, term):
+        return self.weight(len(self.tokens), self.document_frequency.get(term, 0))
+
+    def _index(self, doc_id):
+        weights = {
+            term: (1 + math.log(count)) * self.idf(term)
+            for term, count in self.tokens[doc_id].items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        vector = {term: weight / norm for term, weight in weights.items() if weight}
+        self.vectors[doc_id] = vector
+        for term, weight in vector.items():
+            self.postings[term][doc_id] = weight
+
+    def update(self, doc_id, text):
+        self.remove(doc_id)
+        self.tokens[doc_id] = Counter(text_tokens(text))
+        self.document_frequency.update(self.tokens[doc_id].keys())
+        self._index(doc_id)
+
+    def remove(self, doc_id):
+        counts = self.tokens.pop(doc_id, None)
+        if counts is None:
+            return
+        for term in self.vectors.pop(doc_id, {}):
+            self.postings[term].pop(doc_id, None)
+        self.document_frequency.subtract(counts.keys())
+
+    def similarity(self, first_id, second_id):
+        first, second = self.vectors.get(first_id, {}), self.vectors.get(second_id, {})
+        if len(first) > len(second):
+            first, second = second, first
+        return sum(weight * second.get(term, 0.0) for term, weight in first.items())
+
+    def scores(self, doc_id):
+        scores = defaultdict(float)
+        for term, weight in self.vectors.get(doc_id, {}).items():
+            for other_id, other_weight in self.postings[term].items():
+                if other_id != doc_id:
+                    scores[other_id] += weight * other_weight
+        return scores
+
+
+class SpellSimilarity:
+    model = Spell
+    fields = ('id', 'name', 'desc', 'level', 'school')
+    LEVEL_BONUS = 0.1
+    SCHOOL_BONUS = 0.2
+
+    def __init__(self, rows):
+        self.rows = {row['id']: row for row in rows}
+        self.groups = defaultdict(set)
+        for row in self.rows.values():
+            self.groups[self.group_key(row)].add(row['id'])
+        self.index = TfidfIndex({row_id: self.text(row) for row_id, row in self.rows.items()})
+
+    @classmethod
+    def load(cls):
+        return cls(cls.model.objects.values(*cls.fields).iterator())
+
+    @staticmethod
+    def text(row):
+        return f"{row['name']} {row['desc']}"
+
+    @staticmethod
+    def group_key(row):
+        return (row['level'], row['school'])
+
+    def bonus(self, source, other):
+        return (
+            self.LEVEL_BONUS * (source['level'] == other['level'])
+            + self.SCHOOL_BONUS * (source['school'] == other['school'])
+        )
+
+    def update(self, row):
+        self.remove(row['id'])
+        self.rows[row['id']] = row
+        self.groups[self.group_key(row)].add(row['id'])
+        self.index.update(row['id'], self.text(row))
+
+    def remove(self, row_id):
+        row = self.rows.pop(row_id, None)
+        if row is not None:
+            self.groups[self.group_key(row)].discard(row_id)
+            self.index.remove(row_id)
+
+    def score(self, source_id, target_id):
+        return self.index.similarity(source_id, target_id) + self.bonus(self.rows[source_id], self.rows[target_id])
+
+    def neighbors(self, source_id, limit):
+        source = self.rows[source_id]
+        scores = self.index.scores(source_id)
+        for target_id in self.groups[self.group_key(source)]:
+            if target_id != source_id:
+                scores[target_id] += 0.0
+        scored = (
+            (score + self.bonus(source, self.rows[target_id]), -target_id)
+            for target_id, score in scores.items()
+        )
+        return [(-negative_id, score) for score, negative_id in heapq.nlargest(limit, scored) if score > 0]
+
+
+class SimilarItemsTable:
+    LIMIT = 10
+    MAX_AGE = 600
+    NO_NEIGHBORS = 0
+    ENGINES = {
+        'spell': SpellSimilarity,
+    }
+
+    _engines = {}
+    _lock = threading.RLock()
+
+    @classmethod
+    def _engine(cls, content_type, reload=False):
+        cached = cls._engines.get(content_type)
+        if reload or not cached or time.monotonic() - cached[0] >= cls.MAX_AGE:
+            cached = (time.monotonic(), cls.ENGINES[content_type].load())
+            cls._engines[content_type] = cached
+        return cached[1]
+
+    @classmethod
+    def _rows(cls, content_type, source_id, neighbors):
+        if not neighbors:
+            return [SimilarItem(
+                content_type=content_type, source_id=source_id, target_id=cls.NO_NEIGHBORS, score=0.0, rank=0
+            )]
+        return [
+            SimilarItem(content_type=content_type, source_id=source_id, target_id=target_id, score=score, rank=rank)
+            for rank, (target_id, score) in enumerate(neighbors)
+        ]
+
+    @classmethod
+    def refresh(cls, content_type):
+        with cls._lock:
+            engine = cls._engine(content_type, reload=True)
+            rows = []
+            for source_id in engine.rows:
+                rows.extend(cls._rows(content_type, source_id, engine.neighbors(source_id, cls.LIMIT)))
+        with transaction.atomic():
+            SimilarItem.objects.filter(content_type=content_type).delete()
+            SimilarItem.objects.bulk_create(rows, batch_size=1000)
+        return len(engine.rows)
+
+    @classmethod
+    def refresh_objects(cls, content_type, object_ids):
+        object_ids = set(object_ids)
+        with cls._lock:
+            engine = cls._engine(content_type)
+            engine_model = cls.ENGINES[content_type]
+            fresh = {row['id']: row for row in engine_model.model.objects.filter(id__in=object_ids).values(*engine_model.fields)}
+            for object_id in object_ids:
+                if object_id in fresh:
+                    engine.update(fresh[object_id])
+                else:
+                    engine.remove(object_id)
+
+            stored = {
+                row['source_id']: row['lowest'] if row['size'] >= cls.LIMIT else 0.0
+                for row in SimilarItem.objects.filter(content_type=content_type)
+                .values('source_id').annotate(lowest=Min('score'), size=Count('id'))
+            }
+            affected = set(fresh) | set(
+                SimilarItem.objects.filter(content_type=content_type, target_id__in=object_ids)
+                .values_list('source_id', flat=True)
+            )
+            for object_id in fresh:
+                for source_id in engine.index.scores(object_id).keys() | engine.groups[engine.group_key(fresh[object_id])]:
+                    if source_id not in affected and source_id in stored:
+                        if engine.score(source_id, object_id) > stored[source_id]:
+                            affected.add(source_id)
+
+            rows = []
+            for source_id in affected:
+                if source_id in engine.rows:
+                    rows.extend(cls._rows(content_type, source_id, engine.neighbors(source_id, cls.LIMIT)))
+        with transaction.atomic():
+            SimilarItem.objects.filter(content_type=content_type, source_id__in=affected | object_ids).delete()
+            SimilarItem.objects.bulk_create(rows, batch_size=1000)
+        return len(affected)
+
+    @staticmethod
+    def _stored_ids(content_type, source_id, limit):
+        return list(
+            SimilarItem.objects.filter(content_type=content_type, source_id=source_id)
+            .order_by('rank').values_list('target_id', flat=True)[:limit]
+        )
+
+    @classmethod
+    def similar(cls, content_type, obj, limit=5):
+        ids = cls._stored_ids(content_type, obj.id, limit)
+        if not ids:
+            try:
+                cls.refresh_objects(content_type, [obj.id])
+            except Exception as e:
+                logger.error(f"Ошибка при расчёте похожих объектов {content_type} {obj.id}: {e}")
+                return []
+            ids = cls._stored_ids(content_type, obj.id, limit)
+        ids = [object_id for object_id in ids if object_id != cls.NO_NEIGHBORS]
+        objects = type(obj).objects.in_bulk(ids)
+        return [objects[object_id] for object_id in ids if object_id in objects]
+
+
+class EquipmentTokenIndex:
+    TOKEN_LENGTH = 50
+
+    @classmethod
+    def tokens(cls, equipment):
+        return {token[:cls.TOKEN_LENGTH] for token in text_tokens(f"{equipment.name} {equipment.description or ''}")}
+
+    @classmethod
+    def update(cls, equipment_list):
+        equipment_list = list(equipment_list)
+        with transaction.atomic():
+            EquipmentToken.objects.filter(equipment__in=[equipment.id for equipment in equipment_list]).delete()
+            EquipmentToken.objects.bulk_create(
+                [
+                    EquipmentToken(equipment_id=equipment.id, token=token)
+                    for equipment in equipment_list for token in cls.tokens(equipment)
+                ],
+                batch_size=1000
+            )
+
+    @classmethod
+    def rebuild(cls, batch_size=500):
+        EquipmentToken.objects.all().delete()
+        equipment_list = list(Equipment.objects.only('id', 'name', 'description'))
+        for start in range(0, len(equipment_list), batch_size):
+            cls.update(equipment_list[start:start + batch_size])
+        return len(equipment_list)
+
+    @staticmethod
+    def document_frequencies():
+        return ListResultCache.cached('equipment', 'token-frequencies', lambda: {
+            'size': Equipment.objects.count(),
+            'tokens': dict(
+                EquipmentToken.objects.values('token').annotate(frequency=Count('id')).values_list('token', 'frequency')
+            ),
+        })
+
+    @classmethod
+    def similar_ids(cls, equipment, limit=5):
+        frequencies = cls.document_frequencies()
+        weights = {
+            token: TfidfIndex.weight(frequencies['size'], frequencies['tokens'].get(token, 0))
+            for token in cls.tokens(equipment)
+        }
+        weights = {token: weight for token, weight in weights.items() if weight}
+        scores = defaultdict(float)
+        matches = (
+            EquipmentToken.objects.filter(token__in=list(weights))
+            .exclude(equipment_id=equipment.id)
+            .values_list('equipment_id', 'token')
+        )
+        for equipment_id, token in matches.iterator():
+            scores[equipment_id] += weights[token]
+        nearest = heapq.nlargest(limit, ((score, -equipment_id) for equipment_id, score in scores.items()))
+        return [-negative_id for score, negative_id in nearest]
+
+    @classmethod
+    def similar(cls, equipment, limit=5):
+        ids = cls.similar_ids(equipment, limit)
+        objects = Equipment.objects.in_bulk(ids)
+        return [objects[equipment_id] for equipment_id in ids if equipment_id in objects]
+
+
+class MonsterNeighbors:
+    LIMIT = 10
+    MAX_AGE = 600
+    ABILITIES = ('strength', 'dexterity', 'constitution', 'intelligence', 'wisdom', 'charisma')
+    SPEEDS = ('walk', 'fly', 'swim', 'climb', 'burrow')
+    SIZES = [value for value, label in SIZE_OPTIONS]
+    DEFAULT_WEIGHTS = {
+        'abilities': 1.0,
+        'hit_points': 1.5,
+        'armor_class': 1.0,
+        'speed': 0.5,
+        'type': 4.0,
+        'size': 1.0,
+    }
+
+    _state = None
+    _lock = threading.RLock()
+
+    @classmethod
+    def weights(cls):
+        return {**cls.DEFAULT_WEIGHTS, **getattr(settings, 'MONSTER_SIMILARITY_WEIGHTS', {})}
+
+    @staticmethod
+    def parse_speed(value):
+        match = re.search(r'\d+', value or '')
+        return int(match.group()) if match else 0
+
+    @classmethod
+    def _profiles(cls, monster_ids=None):
+        monsters = Monster.objects.all()
+        armor_classes = Armor_class.objects.all()
+        speeds = Speed.objects.all()
+        if monster_ids is not None:
+            monsters = monsters.filter(id__in=monster_ids)
+            armor_classes = armor_classes.filter(monster_id__in=monster_ids)
+            speeds = speeds.filter(monster_id__in=monster_ids)
+
+        primary_ac = dict(armor_classes.values('monster_id').annotate(top=Max('value')).values_list('monster_id', 'top'))
+        movement = defaultdict(dict)
+        for monster_id, movement_type, value in speeds.values_list('monster_id', 'movement_type', 'value'):
+            movement[monster_id][movement_type] = cls.parse_speed(value)
+
+        profiles = {}
+        for row in monsters.values('id', 'size', 'type', 'hit_points', *cls.ABILITIES).iterator():
+            stats = [row[ability] for ability in cls.ABILITIES]
+            stats.append(math.log1p(max(row['hit_points'], 0)))
+            stats.append(primary_ac.get(row['id'], 10))
+            stats.extend(movement[row['id']].get(speed, 0) for speed in cls.SPEEDS)
+            size = cls.SIZES.index(row['size']) if row['size'] in cls.SIZES else cls.SIZES.index('Medium')
+            profiles[row['id']] = (stats, normalize_text(row['type']).strip(), size)
+        return profiles
+
+    @classmethod
+    def _load(cls):
+        profiles = cls._profiles()
+        columns = list(zip(*(stats for stats, monster_type, size in profiles.values()))) or [()] * 13
+        means = [sum(column) / len(column) if column else 0.0 for column in columns]
+        deviations = [
+            math.sqrt(sum((value - mean) ** 2 for value in column) / len(column)) if column else 0.0
+            for column, mean in zip(columns, means)
+        ]
+        weights = cls.weights()
+        state = {
+            'loaded_at': time.monotonic(),
+            'means': means,
+            'deviations': [deviation or 1.0 for deviation in deviations],
+            'dimension_weights': (
+                [weights['abilities']] * len(cls.ABILITIES)
+                + [weights['hit_points'], weights['armor_class']]
+                + [weights['speed']] * len(cls.SPEEDS)
+            ),
+            'type_weight': weights['type'],
+            'size_weight': weights['size'],
+            'vectors': {},
+            'neighbors': {},
+        }
+        for monster_id, profile in profiles.items():
+            state['vectors'][monster_id] = cls._vector(state, profile)
+        return state
+
+    @staticmethod
+    def _vector(state, profile):
+        stats, monster_type, size = profile
+        scaled = [
+            (value - mean) / deviation
+            for value, mean, deviation in zip(stats, state['means'], state['deviations'])
+        ]
+        return scaled, monster_type, size
+
+    @classmethod
+    def _get_state(cls):
+        if cls._state is None or time.monotonic() - cls._state['loaded_at'] >= cls.MAX_AGE:
+            cls._state = cls._load()
+        return cls._state
+
+    @staticmethod
+    def distance(state, first, second):
+        first_stats, first_type, first_size = first
+        second_stats, second_type, second_size = second
+        distance = sum(
+            weight * (a - b) ** 2
+            for weight, a, b in zip(state['dimension_weights'], first_stats, second_stats)
+        )
+        distance += state['type_weight'] * (first_type != second_type)
+        distance += state['size_weight'] * abs(first_size - second_size)
+        return distance
+
+    @classmethod
+    def neighbors(cls, monster_id, limit=5):
+        with cls._lock:
+            state = cls._get_state()
+            cached = state['neighbors'].get(monster_id)
+            if cached is not None and limit <= len(cached):
+                return cached[:limit]
+            source = state['vectors'].get(monster_id)
+            if source is None:
+                return []
+            nearest = heapq.nsmallest(
+                max(limit, cls.LIMIT),
+                (
+                    (cls.distance(state, source, vector), other_id)
+                    for other_id, vector in state['vectors'].items() if other_id != monster_id
+                )
+            )
+            state['neighbors'][monster_id] = [(other_id, distance) for distance, other_id in nearest]
+            return state['neighbors'][monster_id][:limit]
+
+    @classmethod
+    def update(cls, monster_ids):
+        with cls._lock:
+            if cls._state is None:
+                return
+            profiles = cls._profiles(monster_ids)
+            for monster_id in monster_ids:
+                if monster_id in profiles:
+                    cls._state['vectors'][monster_id] = cls._vector(cls._state, profiles[monster_id])
+                else:
+                    cls._state['vectors'].pop(monster_id, None)
+            cls._state['neighbors'].clear()
+
+    @classmethod
+    def similar(cls, monster, limit=5):
+        ids = [monster_id for monster_id, distance in cls.neighbors(monster.id, limit)]
+        objects = Monster.objects.in_bulk(ids)
+        return [objects[monster_id] for monster_id in ids if monster_id in objects]
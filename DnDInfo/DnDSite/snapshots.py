@@ -0,0 +1,127 @@
+import gzip
+import json
+from collections import Counter
+
+from django.utils import timezone
+
+from .models import Monster, Spell, Equipment, ImportedRecord
+from .utils import DataImporter
+
+SNAPSHOT_FORMAT = 'dnd-srd-snapshot'
+SNAPSHOT_VERSION = 1
+
+MONSTER_FIELDS = [
+    'name', 'size', 'type', 'hit_points', 'strength', 'dexterity', 'constitution',
+    'intelligence', 'wisdom', 'charisma', 'is_homebrew', 'is_approved',
+]
+SPELL_FIELDS = [
+    'name', 'desc', 'spell_range', 'duration', 'casting_time', 'level', 'school',
+    'ritual', 'concentration', 'is_homebrew', 'is_approved',
+]
+EQUIPMENT_FIELDS = [
+    'name', 'description', 'weight', 'cost_quantity', 'cost_unit', 'is_homebrew', 'is_approved',
+]
+
+
+class SrdSnapshot:
+    CHUNK_SIZE = 500
+
+    def __init__(self, importer=None):
+        self.importer = importer or DataImporter()
+
+    @staticmethod
+    def _fields(obj, field_names):
+        return {name: getattr(obj, name) for name in field_names}
+
+    @staticmethod
+    def _sources(content_type):
+        return {
+            object_id: (index, content_hash)
+            for object_id, index, content_hash in ImportedRecord.objects.filter(
+                content_type=content_type
+            ).values_list('object_id', 'source_index', 'content_hash')
+        }
+
+    def _records(self):
+        sources = self._sources('monster')
+        monsters = Monster.objects.filter(is_homebrew=False).prefetch_related('armor_classes', 'speeds')
+        for monster in monsters.order_by('id').iterator(chunk_size=self.CHUNK_SIZE):
+            index, content_hash = sources.get(monster.id, (None, None))
+            yield {
+                'type': 'monster',
+                'index': index,
+                'hash': content_hash,
+                'fields': self._fields(monster, MONSTER_FIELDS),
+                'armor_classes': [[ac.type, ac.value] for ac in monster.armor_classes.all()],
+                'speeds': [[speed.movement_type, speed.value] for speed in monster.speeds.all()],
+            }
+
+        sources = self._sources('spell')
+        spells = Spell.objects.filter(is_homebrew=False).prefetch_related('components')
+        for spell in spells.order_by('id').iterator(chunk_size=self.CHUNK_SIZE):
+            index, content_hash = sources.get(spell.id, (None, None))
+            yield {
+                'type': 'spell',
+                'index': index,
+                'hash': content_hash,
+                'fields': self._fields(spell, SPELL_FIELDS),
+                'components': [component.type for component in spell.components.all()],
+            }
+
+        sources = self._sources('equipment')
+        equipment = Equipment.objects.filter(is_homebrew=False)
+        for item in equipment.order_by('id').iterator(chunk_size=self.CHUNK_SIZE):
+            index, content_hash = sources.get(item.id, (None, None))
+            yield {
+                'type': 'equipment',
+                'index': index,
+                'hash': content_hash,
+                'fields': self._fields(item, EQUIPMENT_FIELDS),
+            }
+
+    def export(self, path):
+        counts = Counter()
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            header = {
+                'format': SNAPSHOT_FORMAT,
+                'version': SNAPSHOT_VERSION,
+                'created_at': timezone.now().isoformat(),
+            }
+            f.write(json.dumps(header, ensure_ascii=False) + '\n')
+            for record in self._records():
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+                counts[record['type']] += 1
+        return counts
+
+    def read(self, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                raise ValueError('Файл не является снимком SRD')
+            if header.get('format') != SNAPSHOT_FORMAT:
+                raise ValueError('Файл не является снимком SRD')
+            if header.get('version') != SNAPSHOT_VERSION:
+                raise ValueError(f"Неподдерживаемая версия снимка: {header.get('version')}")
+
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def load(self, path, batch_size=500, sync=False):
+        stats = {}
+        batch = []
+        batch_type = None
+
+        for record in self.read(path):
+            if batch and (record['type'] != batch_type or len(batch) >= batch_size):
+                stats.setdefault(batch_type, Counter()).update(self.importer.import_records(batch_type, batch, sync))
+                batch = []
+            batch_type = record.pop('type')
+            if batch_type not in DataImporter.ENTITY_MODELS:
+                raise ValueError(f'Неизвестный тип записи: {batch_type}')
+            batch.append(record)
+
+        if batch:
+            stats.setdefault(batch_type, Counter()).update(self.importer.import_records(batch_type, batch, sync))
+        return stats
@@ -0,0 +1,92 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from .utils import ApiResponseCache
+
+
+class SrdStandInHandler(BaseHTTPRequestHandler):
+    server_version = 'SrdStandIn/1.0'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, body=None, headers=None):
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8') if body is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        server = self.server
+        server.count_request()
+        time.sleep(max(0.0, server.latency + random.uniform(-server.jitter, server.jitter)))
+
+        if server.is_throttled():
+            self._send_json(429, {'error': 'Too Many Requests'}, {'Retry-After': '1'})
+            return
+        if random.random() < server.error_rate:
+            self._send_json(503, {'error': 'Service Unavailable'})
+            return
+
+        path = urlsplit(self.path).path
+        if not path.startswith(server.prefix):
+            self._send_json(404, {'error': 'Not found'})
+            return
+
+        entry = server.fixtures.get(path[len(server.prefix):])
+        if entry is None:
+            self._send_json(404, {'error': 'Not found'})
+            return
+
+        headers = {}
+        if entry.get('etag'):
+            headers['ETag'] = entry['etag']
+            if self.headers.get('If-None-Match') == entry['etag']:
+                self.send_response(304)
+                self.send_header('ETag', entry['etag'])
+                self.end_headers()
+                return
+        if entry.get('last_modified'):
+            headers['Last-Modified'] = entry['last_modified']
+        self._send_json(200, entry['data'], headers)
+
+
+class SrdStandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, fixtures_dir, prefix='/api/2014', latency=0.0, jitter=0.0,
+                 error_rate=0.0, max_rps=0, verbose=False):
+        super().__init__(address, SrdStandInHandler)
+        self.fixtures = ApiResponseCache(fixtures_dir)
+        self.prefix = prefix.rstrip('/')
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_rps = max_rps
+        self.verbose = verbose
+        self.requests_total = 0
+        self.window_started = time.monotonic()
+        self.window_requests = 0
+        self.lock = threading.Lock()
+
+    def count_request(self):
+        with self.lock:
+            self.requests_total += 1
+            now = time.monotonic()
+            if now - self.window_started >= 1:
+                self.window_started = now
+                self.window_requests = 0
+            self.window_requests += 1
+
+    def is_throttled(self):
+        with self.lock:
+            return bool(self.max_rps) and self.window_requests > self.max_rps
@@ -58,4 +58,59 @@ document.querySelectorAll('form').forEach(form => {
             submitButton.innerHTML = '<span class="spinner-border spinner-border-sm" role="status"></span> Обработка...';
         }
     });
+});
+
+document.querySelectorAll('input[data-autocomplete]').forEach((input, index) => {
+    const list = document.createElement('datalist');
+    list.id = `autocomplete-${index}`;
+    input.setAttribute('list', list.id);
+    input.after(list);
+
+    let timer = null;
+    let lastQuery = '';
+    input.addEventListener('input', () => {
+        clearTimeout(timer);
+        timer = setTimeout(() => {
+            const query = input.value.trim();
+            if (query.length < 2 || query === lastQuery) {
+                return;
+            }
+            lastQuery = query;
+            const params = new URLSearchParams({q: query, type: input.dataset.autocomplete});
+            fetch(`/api/autocomplete/?${params}`)
+                .then(response => response.json())
+                .then(data => {
+                    if (!data.success || input.value.trim() !== query) {
+                        return;
+                    }
+                    list.replaceChildren(...data.results.map(result => {
+                        const option = document.createElement('option');
+                        option.value = result.name;
+                        return option;
+                    }));
+                })
+                .catch(() => {});
+        }, 150);
+    });
+});
+
+document.querySelectorAll('[data-similar-url]').forEach(container => {
+    const section = container.closest('[data-similar-section]');
+    fetch(container.dataset.similarUrl)
+        .then(response => response.ok ? response.text() : '')
+        .then(html => {
+            if (!html.trim()) {
+                if (section) {
+                    section.remove();
+                } else {
+                    container.innerHTML = '';
+                }
+                return;
+            }
+            container.innerHTML = html;
+            if (section) {
+                section.classList.remove('d-none');
+            }
+        })
+        .catch(() => {});
 });
\ No newline at end of file
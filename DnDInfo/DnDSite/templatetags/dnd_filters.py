@@ -114,13 +114,15 @@ def get_estimated_xp(hp):
 
 
 @register.simple_tag
-def build_pagination_url(request, page_number=None):
+def build_pagination_url(request, page_number=None, cursor=None):
     params = {}
     for key in request.GET:
-        if key != 'page' and request.GET.get(key):
+        if key not in ('page', 'cursor') and request.GET.get(key):
             params[key] = request.GET.get(key)
     if page_number:
         params['page'] = page_number
+    if cursor:
+        params['cursor'] = cursor
     if params:
         return "?" + urlencode(params)
     return "?"
@@ -1,3 +1,705 @@
-from django.test import TestCase
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .list_cache import ListResultCache
+from .models import Armor_class, Equipment, ImportCheckpoint, ImportedRecord, Monster, SimilarItem, Speed, Spell
+from .pagination import EstimatedCountPaginator, KeysetPaginator
+from .search import Autocomplete, NameSuggester, SearchIndex, SearchResults, stem_term
+from .services import CatalogListService
+from .similarity import EquipmentTokenIndex, MonsterNeighbors, SimilarItemsTable, TfidfIndex
+from .srd_standin import SrdStandInServer
+from .utils import ApiResponseCache, DataImporter, DndApiClient
+
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, LIST_PAGINATION='offset', LIST_COUNT_ESTIMATE_THRESHOLD=1000)
+class CatalogTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        SearchIndex.is_available()
+        super().setUpClass()
+
+    def setUp(self):
+        cache.clear()
+        NameSuggester._indexes.clear()
+        Autocomplete._indexes.clear()
+        SimilarItemsTable._engines.clear()
+        MonsterNeighbors._state = None
+
+    @staticmethod
+    def create(model, objects):
+        for obj in objects:
+            obj.update_search_fields()
+        return model.objects.bulk_create(objects)
+
+    def params(self, content_type, **params):
+        defaults = {'search': '', 'show_homebrew': False, 'sort': 'relevance' if params.get('search') else 'name'}
+        defaults.update({name: '' for name in CatalogListService.FILTERS[content_type]})
+        defaults.update(params)
+        return defaults
+
+
+class CatalogListQueryCountTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create(Monster, [
+            Monster(
+                name=f'Гоблин {i:02d}' if i % 2 else f'Орк {i:02d}', size='Small', type='humanoid',
+                hit_points=i, strength=10, dexterity=10, constitution=10, intelligence=10, wisdom=10, charisma=10,
+            )
+            for i in range(30)
+        ])
+        cls.create(Spell, [
+            Spell(name=f'Огненный шар {i:02d}' if i % 2 else f'Щит {i:02d}', desc='Описание заклинания',
+                  duration='1 минута', casting_time='1 действие', level=i % 10, school='evocation')
+            for i in range(30)
+        ])
+        cls.create(Equipment, [
+            Equipment(name=f'Меч {i:02d}' if i % 2 else f'Щит {i:02d}', description='Снаряжение',
+                      weight=i, cost_quantity=i % 7)
+            for i in range(30)
+        ])
+        SearchIndex.rebuild()
+
+    def get_page(self, content_type, page=1, **params):
+        return CatalogListService.get_page(content_type, self.params(content_type, **params), page)
+
+    def expected_ids(self, content_type, page, **params):
+        queryset = CatalogListService.build_queryset(content_type, self.params(content_type, **params))
+        size = CatalogListService.PAGE_SIZES[content_type]
+        return list(queryset.values_list('id', flat=True)[(page - 1) * size:page * size])
+
+    def assertPage(self, result, content_type, page, **params):
+        self.assertEqual([obj.id for obj in result['page_obj']], self.expected_ids(content_type, page, **params))
+
+    def test_list_query_count(self):
+        for content_type in ('monster', 'spell', 'equipment'):
+            with self.subTest(content_type=content_type):
+                cold = self.get_page(content_type)
+                self.assertEqual(cold['query_count'], 2)
+                self.assertEqual(cold['total_count'], 30)
+                self.assertPage(cold, content_type, 1)
+
+                warm = self.get_page(content_type)
+                self.assertEqual(warm['query_count'], 1)
+
+                second = self.get_page(content_type, page=2)
+                self.assertEqual(second['query_count'], 1)
+                self.assertEqual(second['total_count'], 30)
+                self.assertPage(second, content_type, 2)
+
+    def test_search_and_sort_query_count(self):
+        cases = (
+            ('monster', 'гоблин', 'hit_points'),
+            ('spell', 'щит', 'level'),
+            ('equipment', 'щит', 'weight_desc'),
+        )
+        for content_type, search, sort in cases:
+            for ordering in ('relevance', sort):
+                with self.subTest(content_type=content_type, sort=ordering):
+                    cold = self.get_page(content_type, search=search, sort=ordering)
+                    self.assertEqual(cold['query_count'], 2)
+                    self.assertEqual(cold['total_count'], 15)
+                    self.assertEqual(cold['suggestions'], [])
+
+                    second = self.get_page(content_type, page=2, search=search, sort=ordering)
+                    self.assertEqual(second['query_count'], 1)
+                    if ordering != 'relevance':
+                        self.assertPage(second, content_type, 2, search=search, sort=ordering)
+                    else:
+                        self.assertEqual(len(second['page_obj']), 15 - CatalogListService.PAGE_SIZES[content_type])
+
+    def test_filter_change_is_a_new_cache_entry(self):
+        self.get_page('spell')
+        filtered = self.get_page('spell', level='3')
+        self.assertEqual(filtered['query_count'], 2)
+        self.assertEqual(filtered['total_count'], 3)
+
+
+class KeysetPaginatorTests(CatalogTestCase):
+    PER_PAGE = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create(Equipment, [
+            Equipment(name=f'Предмет {i:02d}', weight=i % 3,
+                      cost_quantity=None if i % 4 == 0 else Decimal(i % 3) + Decimal('0.50'))
+            for i in range(23)
+        ])
+
+    def expected(self, descending):
+        items = list(Equipment.objects.all())
+        with_price = sorted(
+            (item for item in items if item.cost_quantity is not None),
+            key=lambda item: (-item.cost_quantity if descending else item.cost_quantity, item.id),
+        )
+        without_price = sorted((item for item in items if item.cost_quantity is None), key=lambda item: item.id)
+        ordered = with_price + without_price if descending else without_price + with_price
+        return [item.id for item in ordered]
+
+    def walk(self, paginator):
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            self.assertLess(len(pages), 10)
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        return pages
+
+    def test_forward_and_back(self):
+        for ordering in (['cost_quantity'], ['-cost_quantity']):
+            with self.subTest(ordering=ordering):
+                paginator = KeysetPaginator(Equipment.objects.all(), self.PER_PAGE, ordering)
+                pages = self.walk(paginator)
+                forward = [[item.id for item in page] for page in pages]
+                self.assertEqual(sum(forward, []), self.expected(ordering[0].startswith('-')))
+                self.assertEqual([page.number for page in pages], list(range(1, paginator.num_pages + 1)))
+                self.assertFalse(pages[0].has_previous())
+                self.assertEqual(pages[0].previous_cursor, '')
+
+                page = pages[-1]
+                backward = [[item.id for item in page]]
+                while page.has_previous():
+                    page = paginator.get_page(page.previous_cursor)
+                    backward.insert(0, [item.id for item in page])
+                self.assertEqual(backward, forward)
+                self.assertEqual(page.number, 1)
+
+    def test_ties_span_pages(self):
+        paginator = KeysetPaginator(Equipment.objects.all(), self.PER_PAGE, ['weight'])
+        ids = [item.id for page in self.walk(paginator) for item in page]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(ids, list(Equipment.objects.order_by('weight', 'id').values_list('id', flat=True)))
+
+    def test_invalid_cursor_returns_first_page(self):
+        paginator = KeysetPaginator(Equipment.objects.all(), self.PER_PAGE, ['cost_quantity'])
+        first = [item.id for item in paginator.get_page()]
+        for cursor in ('garbage', paginator.encode_cursor([1], 'next', 2), paginator.encode_cursor([1, 1], 'up', 2)):
+            with self.subTest(cursor=cursor):
+                page = paginator.get_page(cursor)
+                self.assertEqual(page.number, 1)
+                self.assertEqual([item.id for item in page], first)
+
+    @override_settings(LIST_PAGINATION='keyset')
+    def test_get_page_query_count(self):
+        params = self.params('equipment', sort='price_asc')
+        first = CatalogListService.get_page('equipment', params, 1)
+        self.assertEqual(first['query_count'], 2)
+        self.assertEqual(first['total_count'], 23)
+
+        second = CatalogListService.get_page('equipment', params, 1, cursor=first['page_obj'].next_cursor)
+        self.assertEqual(second['query_count'], 1)
+        self.assertEqual(second['page_obj'].number, 2)
+        size = CatalogListService.PAGE_SIZES['equipment']
+        self.assertEqual([item.id for item in second['page_obj']], self.expected(False)[size:size * 2])
+
+
+class FakeApiClient:
+    def __init__(self, documents, interrupt_at=None):
+        self.documents = documents
+        self.interrupt_at = interrupt_at
+        self.fetched = []
+
+    def get_detail(self, index):
+        if index == self.interrupt_at:
+            raise KeyboardInterrupt
+        self.fetched.append(index)
+        return self.documents[index]
+
+    get_monster_detail = get_spell_detail = get_equipment_detail = get_detail
+
+
+def equipment_document(index, name, quantity=1):
+    return {'index': index, 'name': name, 'weight': 2, 'cost': {'quantity': quantity, 'unit': 'gp'}}
+
+
+class ImportSyncTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.documents = {
+            'club': equipment_document('club', 'Дубинка'),
+            'dagger': equipment_document('dagger', 'Кинжал', 2),
+            'shield': equipment_document('shield', 'Щит', 10),
+        }
+
+    def run_import(self, sync=False, resume=False, client=None):
+        importer = DataImporter(api_client=client or FakeApiClient(self.documents))
+        return importer.import_many('equipment', list(self.documents), batch_size=2, sync=sync, resume=resume)
+
+    def test_unchanged_documents_are_skipped(self):
+        self.assertEqual(self.run_import(), {'inserted': 3})
+        self.assertEqual(ImportedRecord.objects.filter(content_type='equipment').count(), 3)
+        hashes = dict(ImportedRecord.objects.values_list('source_index', 'content_hash'))
+
+        self.assertEqual(self.run_import(), {'unchanged': 3})
+        self.assertEqual(dict(ImportedRecord.objects.values_list('source_index', 'content_hash')), hashes)
+
+        self.documents['dagger'] = equipment_document('dagger', 'Кинжал', 3)
+        self.assertEqual(self.run_import(sync=True), {'updated': 1, 'unchanged': 2})
+        self.assertEqual(Equipment.objects.get(name='Кинжал').cost_quantity, 3)
+        self.assertNotEqual(ImportedRecord.objects.get(source_index='dagger').content_hash, hashes['dagger'])
+        self.assertEqual(Equipment.objects.count(), 3)
+
+    def test_name_matched_rows_are_tracked_on_first_import(self):
+        legacy = Equipment.objects.create(name='Щит', weight=6, cost_quantity=10)
+
+        self.assertEqual(self.run_import(), {'inserted': 2, 'existing': 1})
+        imported = ImportedRecord.objects.get(source_index='shield')
+        self.assertEqual(imported.object_id, legacy.id)
+        self.assertEqual(imported.content_hash, '')
+
+        self.assertEqual(self.run_import(sync=True), {'updated': 1, 'unchanged': 2})
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.weight, 2)
+
+        self.assertEqual(self.run_import(sync=True), {'unchanged': 3})
+        self.assertEqual(Equipment.objects.count(), 3)
+
+    def checkpoints(self):
+        return set(ImportCheckpoint.objects.filter(content_type='equipment').values_list('source_index', flat=True))
+
+    def test_resume_after_interrupt(self):
+        self.documents['torch'] = equipment_document('torch', 'Факел')
+        self.documents['rope'] = equipment_document('rope', 'Верёвка')
+
+        with self.assertRaises(KeyboardInterrupt):
+            self.run_import(client=FakeApiClient(self.documents, interrupt_at='torch'))
+        self.assertEqual(self.checkpoints(), {'club', 'dagger', 'shield'})
+        self.assertEqual(Equipment.objects.count(), 3)
+
+        client = FakeApiClient(self.documents)
+        self.assertEqual(self.run_import(resume=True, client=client), {'resumed': 3, 'inserted': 2})
+        self.assertEqual(client.fetched, ['torch', 'rope'])
+        self.assertEqual(self.checkpoints(), set(self.documents))
+        self.assertEqual(Equipment.objects.count(), 5)
+
+    def test_full_run_clears_checkpoints(self):
+        self.run_import()
+        ImportCheckpoint.objects.create(content_type='equipment', source_index='lantern')
+        client = FakeApiClient(self.documents)
+        self.assertEqual(self.run_import(client=client), {'unchanged': 3})
+        self.assertEqual(client.fetched, list(self.documents))
+        self.assertEqual(self.checkpoints(), set(self.documents))
+
+
+class EstimatedCountTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        stats = dict(strength=10, dexterity=10, constitution=10, intelligence=10, wisdom=10, charisma=10)
+        cls.create(Monster, [
+            Monster(name=f'Гоблин {i:02d}', size='Small', type='humanoid', hit_points=i, **stats)
+            for i in range(30)
+        ])
+        cls.create(Monster, [
+            Monster(name=f'Самоделка {i:03d}', size='Small', type='humanoid', hit_points=i,
+                    is_homebrew=True, is_approved=True, **stats)
+            for i in range(300)
+        ])
+
+    def official(self):
+        return Monster.objects.filter(is_homebrew=False)
+
+    def test_estimate_count(self):
+        self.assertEqual(ListResultCache.estimate_count(self.official(), 100), (30, False))
+        self.assertEqual(ListResultCache.estimate_count(self.official(), 20), (30, True))
+        self.assertEqual(ListResultCache.estimate_count(Monster.objects.filter(is_homebrew=True), 50), (300, True))
+
+    def test_estimated_paginator(self):
+        paginator = EstimatedCountPaginator(self.official().order_by('id'), 12, count=100, count_is_estimated=True)
+        self.assertTrue(paginator.page(2).has_next())
+        last = paginator.page(3)
+        self.assertEqual(len(last), 6)
+        self.assertFalse(last.has_next())
+        with self.assertRaises(EmptyPage):
+            paginator.page(4)
+        self.assertEqual(paginator.get_page(4).number, 1)
+        self.assertEqual(paginator.get_page('abc').number, 1)
+
+    @override_settings(LIST_COUNT_ESTIMATE_THRESHOLD=20)
+    def test_get_page_estimates_large_lists(self):
+        params = self.params('monster')
+        first = CatalogListService.get_page('monster', params, 1)
+        self.assertEqual(first['total_count'], 30)
+        self.assertTrue(first['page_obj'].paginator.count_is_estimated)
+        self.assertTrue(first['page_obj'].has_next())
+
+        last = CatalogListService.get_page('monster', params, 3)
+        self.assertEqual(len(last['page_obj']), 6)
+        self.assertFalse(last['page_obj'].has_next())
+        self.assertEqual(CatalogListService.get_page('monster', params, 9)['page_obj'].number, 1)
+
+    def test_count_is_invalidated_after_commit(self):
+        params = self.params('monster')
+        self.assertEqual(ListResultCache.count('monster', params, self.official(), 1000), (30, False))
+        with self.captureOnCommitCallbacks(execute=True):
+            Monster.objects.create(name='Орк', size='Medium', type='humanoid', hit_points=15, strength=16,
+                                   dexterity=12, constitution=16, intelligence=7, wisdom=11, charisma=10)
+            self.assertEqual(ListResultCache.count('monster', params, self.official(), 1000), (30, False))
+        self.assertEqual(ListResultCache.count('monster', params, self.official(), 1000), (31, False))
+
+
+class NameSuggesterTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create(Spell, [
+            Spell(name=name, desc='Описание', duration='Мгновенная', casting_time='1 действие', level=3,
+                  school='evocation')
+            for name in ('Огненный шар', 'Молния', 'Щит', 'Ледяной шторм')
+        ])
+
+    def save_spell(self, spell):
+        with self.captureOnCommitCallbacks(execute=True):
+            spell.save()
+
+    def test_suggests_names_with_typos(self):
+        self.assertEqual(NameSuggester.suggest('spell', 'Огненый шар'), ['Огненный шар'])
+        self.assertEqual(NameSuggester.suggest('spell', 'ледяной штром')[0], 'Ледяной шторм')
+        self.assertEqual(NameSuggester.suggest('spell', 'Огненный шар'), [])
+
+    def test_own_writes_update_the_index_in_place(self):
+        NameSuggester.suggest('spell', 'Молния')
+        index = NameSuggester._indexes[('spell', False)]['index']
+
+        spell = Spell.objects.get(name='Молния')
+        spell.name = 'Цепная молния'
+        self.save_spell(spell)
+
+        cached = NameSuggester._indexes[('spell', False)]
+        self.assertIs(cached['index'], index)
+        self.assertEqual(cached['version'], ListResultCache.version('spell'))
+        self.assertEqual(NameSuggester.suggest('spell', 'Цепная молня'), ['Цепная молния'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            spell.delete()
+        self.assertEqual(NameSuggester.suggest('spell', 'Цепная молня'), [])
+
+    def test_writes_from_other_processes_force_a_rebuild(self):
+        NameSuggester.suggest('spell', 'Молния')
+        Spell.objects.filter(name='Щит').update(name='Малый щит')
+        ListResultCache.bump('spell')
+
+        self.save_spell(Spell.objects.get(name='Молния'))
+        self.assertNotIn(('spell', False), NameSuggester._indexes)
+        self.assertEqual(NameSuggester.suggest('spell', 'Малый щт'), ['Малый щит'])
+
+    def completions(self, prefix):
+        return [match['name'] for match in Autocomplete.complete(prefix, 'spell')]
+
+    def test_autocomplete_follows_the_list_version(self):
+        self.assertEqual(self.completions('мол'), ['Молния'])
+        Spell.objects.filter(name='Молния').update(name='Шаровая молния')
+        ListResultCache.bump('spell')
+        self.assertEqual(self.completions('мол'), ['Молния'])
+
+        with mock.patch.object(Autocomplete, 'CHECK_INTERVAL', 0):
+            self.assertEqual(self.completions('мол'), ['Шаровая молния'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Spell.objects.get(name='Шаровая молния').delete()
+        self.assertEqual(self.completions('мол'), [])
+
+
+class SearchIndexTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        spells = [
+            ('Щит', 'Невидимый барьер магической силы.', False, False),
+            ('Огненный шар', 'Яркая вспышка и взрыв пламени.', False, False),
+            ('Стена огня', 'Появляется стена огненного пламени.', False, False),
+            ('Ёжик в тумане', 'Призывает колючего зверька.', False, False),
+            ('Щит веры', 'Мерцающее поле окружает существо.', True, True),
+            ('Тайный щит', 'Неодобренное заклинание.', True, False),
+        ]
+        cls.create(Spell, [
+            Spell(name=name, desc=desc, duration='1 минута', casting_time='1 действие', level=1,
+                  school='abjuration', is_homebrew=is_homebrew, is_approved=is_approved)
+            for name, desc, is_homebrew, is_approved in spells
+        ])
+        SearchIndex.rebuild()
+
+    def names(self, query, homebrew=False, by_rank=False):
+        queryset = Spell.objects.filter(is_homebrew=homebrew)
+        if homebrew:
+            queryset = queryset.filter(is_approved=True)
+        queryset = SearchIndex.filter_queryset(queryset, 'spell', query, by_rank=by_rank)
+        if not by_rank:
+            queryset = queryset.order_by('name')
+        return list(queryset.values_list('name', flat=True))
+
+    def test_stem_term(self):
+        for term, stem in (('щиты', 'щит'), ('щитами', 'щит'), ('огненного', 'огненн'), ('огненный', 'огненн'),
+                           ('шар', 'шар'), ('fireball', 'fireball')):
+            with self.subTest(term=term):
+                self.assertEqual(stem_term(term), stem)
+
+    def test_match_expression(self):
+        self.assertEqual(SearchIndex.match_expression('Щиты'), '"щит"*')
+        self.assertEqual(SearchIndex.match_expression('ОГНЕННЫЕ Шары'), '"огненн"* OR "шар"*')
+        self.assertEqual(SearchIndex.match_expression('Ёжики'), '"ежик"*')
+        self.assertEqual(SearchIndex.match_expression('шар шары'), '"шар"*')
+        self.assertEqual(SearchIndex.match_expression(' -- '), '')
+
+    def test_inflected_forms(self):
+        self.assertEqual(self.names('Щиты'), ['Щит'])
+        self.assertEqual(self.names('щитами'), ['Щит'])
+        self.assertEqual(self.names('огненного'), ['Огненный шар', 'Стена огня'])
+
+    def test_yo_folding_and_case(self):
+        for query in ('ёжик', 'ежик', 'ЁЖИКИ', 'еЖиК'):
+            with self.subTest(query=query):
+                self.assertEqual(self.names(query), ['Ёжик в тумане'])
+        self.assertEqual(self.names('ОгНеНнЫй'), ['Огненный шар', 'Стена огня'])
+
+    def test_name_matches_rank_first(self):
+        self.assertEqual(self.names('огненный', by_rank=True), ['Огненный шар', 'Стена огня'])
+
+    def test_homebrew_visibility(self):
+        self.assertEqual(self.names('щит', homebrew=True), ['Щит веры'])
+        results = SearchResults('щит', 'spell')
+        self.assertEqual(results.count(), 2)
+        self.assertEqual({result['object'].name for result in results[0:10]}, {'Щит', 'Щит веры'})
+
+    def test_failure_is_retried(self):
+        with mock.patch.object(SearchIndex, '_ready', set()), mock.patch.object(SearchIndex, '_failed', {}):
+            with mock.patch.object(SearchIndex, '_ensure_table', side_effect=DatabaseError('table is locked')), \
+                    self.assertLogs('DnDSite.search', 'ERROR'):
+                self.assertFalse(SearchIndex.is_available())
+            self.assertFalse(SearchIndex.is_available())
+            with mock.patch.object(SearchIndex, 'RETRY_INTERVAL', 0):
+                self.assertTrue(SearchIndex.is_available())
+            self.assertEqual(SearchIndex._failed, {})
+
+
+class EquipmentTokenIndexTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        items = [
+            ('Длинный меч', 'Урон: 1к8 (рубящий) | Свойства: Универсальное | Категория: Оружие | Вес: 3 фунтов'),
+            ('Скимитар', 'Урон: 1к6 (рубящий) | Свойства: Лёгкое, Фехтовальное | Категория: Оружие | Вес: 3 фунтов'),
+            ('Короткий меч', 'Урон: 1к6 (колющий) | Свойства: Лёгкое | Категория: Оружие | Вес: 2 фунтов'),
+        ]
+        items += [
+            (f'Инструмент {i:02d}', f'Категория: Снаряжение | Особое свойство: набор {i} | Вес: {i} фунтов')
+            for i in range(12)
+        ]
+        cls.create(Equipment, [
+            Equipment(name=name, description=description, weight=3, cost_quantity=1) for name, description in items
+        ])
+        EquipmentTokenIndex.rebuild()
+
+    def test_common_tokens_are_ignored(self):
+        frequencies = EquipmentTokenIndex.document_frequencies()
+        self.assertEqual(frequencies['size'], 15)
+        self.assertEqual(frequencies['tokens']['категори'], 15)
+
+        sword = Equipment.objects.get(name='Длинный меч')
+        names = [item.name for item in EquipmentTokenIndex.similar(sword, limit=2)]
+        self.assertEqual(names, ['Скимитар', 'Короткий меч'])
+        with self.assertNumQueries(2):
+            EquipmentTokenIndex.similar(sword, limit=2)
+
+    def test_only_common_tokens_gives_no_matches(self):
+        item = Equipment(name='Ящик', description='Категория: Снаряжение | Вес: 3 фунтов')
+        item.id = 0
+        self.assertEqual(EquipmentTokenIndex.similar_ids(item), [])
+
+
+class SimilarSpellsTests(CatalogTestCase):
+    SPELLS = [
+        ('Огненный шар', 'Взрыв огня и пламени поджигает врагов.', 3),
+        ('Огненная стрела', 'Стрела огня и пламени поражает врага.', 1),
+        ('Ледяной луч', 'Луч холода замораживает врага.', 1),
+        ('Ледяная буря', 'Буря холода и льда замораживает врагов.', 4),
+        ('Громовая волна', 'Волна грома отбрасывает существ.', 2),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create(Spell, [
+            Spell(name=name, desc=desc, duration='Мгновенная', casting_time='1 действие', level=level,
+                  school='evocation')
+            for name, desc, level in cls.SPELLS
+        ])
+        cls.create(Spell, [Spell(name='Обнаружение магии', desc='Чувствуете присутствие волшебства.',
+                                 duration='10 минут', casting_time='1 действие', level=1, school='divination')])
+        SimilarItemsTable.refresh('spell')
+
+    def stored(self, name):
+        spell = Spell.objects.get(name=name)
+        rows = SimilarItem.objects.filter(content_type='spell', source_id=spell.id).order_by('rank')
+        names = dict(Spell.objects.values_list('id', 'name'))
+        return [names.get(target_id, target_id) for target_id in rows.values_list('target_id', flat=True)]
+
+    def all_stored(self):
+        return {name: self.stored(name) for name in Spell.objects.values_list('name', flat=True)}
+
+    def test_editing_text_refreshes_own_and_containing_lists(self):
+        self.assertEqual(self.stored('Ледяной луч')[0], 'Ледяная буря')
+        self.assertEqual(self.stored('Огненный шар')[0], 'Огненная стрела')
+
+        spell = Spell.objects.get(name='Ледяной луч')
+        spell.desc = 'Стрела огня и пламени поджигает врагов.'
+        with self.captureOnCommitCallbacks(execute=True):
+            spell.save()
+
+        self.assertEqual(self.stored('Ледяной луч')[:2], ['Огненная стрела', 'Огненный шар'])
+        self.assertEqual(self.stored('Огненный шар')[0], 'Ледяной луч')
+        self.assertEqual(self.stored('Огненная стрела')[0], 'Ледяной луч')
+
+        incremental = self.all_stored()
+        SimilarItemsTable.refresh('spell')
+        self.assertEqual(self.all_stored(), incremental)
+
+    def test_deleted_spell_leaves_every_list(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Spell.objects.get(name='Огненная стрела').delete()
+        for name, neighbors in self.all_stored().items():
+            with self.subTest(name=name):
+                self.assertNotIn('Огненная стрела', neighbors)
+        self.assertEqual(self.stored('Огненный шар')[0], 'Ледяной луч')
+
+    def test_no_neighbors_marker(self):
+        spell = Spell.objects.get(name='Обнаружение магии')
+        self.assertEqual(self.stored('Обнаружение магии'), [SimilarItemsTable.NO_NEIGHBORS])
+        with self.assertNumQueries(1):
+            self.assertEqual(SimilarItemsTable.similar('spell', spell), [])
+
+        SimilarItem.objects.filter(content_type='spell', source_id=spell.id).delete()
+        self.assertEqual(SimilarItemsTable.similar('spell', spell), [])
+        self.assertEqual(self.stored('Обнаружение магии'), [SimilarItemsTable.NO_NEIGHBORS])
+
+    def test_tfidf_update_and_remove(self):
+        index = TfidfIndex({1: 'огненный шар', 2: 'огненная стрела', 3: 'ледяной луч'})
+        self.assertGreater(index.similarity(1, 2), 0)
+        self.assertEqual(index.similarity(1, 3), 0)
+
+        index.update(3, 'огненный луч')
+        self.assertGreater(index.similarity(1, 3), 0)
+        self.assertNotIn(3, index.postings['ледян'])
+        self.assertEqual(index.document_frequency['огненн'], 3)
+        self.assertEqual(set(index.scores(1)), {2, 3})
+
+        index.remove(2)
+        self.assertEqual(set(index.scores(1)), {3})
+        self.assertEqual(index.document_frequency['огненн'], 2)
+        self.assertNotIn(2, index.vectors)
+
+
+class MonsterNeighborsTests(CatalogTestCase):
+    ORC_STATS = dict(strength=16, dexterity=12, constitution=16, intelligence=7, wisdom=11, charisma=10)
+    MONSTERS = [
+        ('Орк', 'Medium', 'humanoid', 15, ORC_STATS, 13),
+        ('Орк-вожак', 'Large', 'humanoid', 15, ORC_STATS, 13),
+        ('Огр-подменыш', 'Medium', 'giant', 15, ORC_STATS, 13),
+        ('Страж', 'Medium', 'humanoid', 15, ORC_STATS, 20),
+        ('Крыса', 'Tiny', 'beast', 1, dict(strength=2, dexterity=11, constitution=9, intelligence=2, wisdom=10,
+                                          charisma=4), 10),
+        ('Красный дракон', 'Huge', 'dragon', 256, dict(strength=27, dexterity=10, constitution=25, intelligence=16,
+                                                      wisdom=13, charisma=21), 19),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        for name, size, monster_type, hit_points, stats, armor_class in cls.MONSTERS:
+            monster = Monster.objects.create(name=name, size=size, type=monster_type, hit_points=hit_points, **stats)
+            Armor_class.objects.create(monster=monster, type='natural', value=armor_class)
+            Speed.objects.create(monster=monster, movement_type='walk', value='30 фт.')
+
+    def neighbor_names(self, name, limit=3):
+        monster = Monster.objects.get(name=name)
+        return [other.name for other in MonsterNeighbors.similar(monster, limit)]
+
+    def test_type_and_size_weights(self):
+        self.assertEqual(self.neighbor_names('Орк'), ['Орк-вожак', 'Страж', 'Огр-подменыш'])
+        orc = Monster.objects.get(name='Орк')
+        distances = dict(MonsterNeighbors.neighbors(orc.id, 3))
+        self.assertAlmostEqual(distances[Monster.objects.get(name='Орк-вожак').id], 1.0)
+        self.assertAlmostEqual(distances[Monster.objects.get(name='Огр-подменыш').id], 4.0)
+
+    @override_settings(MONSTER_SIMILARITY_WEIGHTS={'type': 0.5, 'size': 5.0})
+    def test_settings_override_weights(self):
+        self.assertEqual(MonsterNeighbors.weights()['abilities'], 1.0)
+        self.assertEqual(self.neighbor_names('Орк'), ['Огр-подменыш', 'Страж', 'Орк-вожак'])
+
+    def test_armor_class_and_speed_changes_update_neighbors(self):
+        self.assertEqual(self.neighbor_names('Орк'), ['Орк-вожак', 'Страж', 'Огр-подменыш'])
+
+        armor_class = Armor_class.objects.get(monster__name='Орк')
+        armor_class.value = 20
+        with self.captureOnCommitCallbacks(execute=True):
+            armor_class.save()
+        self.assertEqual(self.neighbor_names('Орк'), ['Страж', 'Орк-вожак', 'Огр-подменыш'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Speed.objects.create(monster=Monster.objects.get(name='Страж'), movement_type='fly', value='60 фт.')
+        self.assertEqual(self.neighbor_names('Орк', 1), ['Орк-вожак'])
+
+
+class SrdStandInTests(SimpleTestCase):
+    CLUB = {'index': 'club', 'name': 'Дубинка', 'weight': 2}
+
+    def start_server(self, **options):
+        fixtures_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(fixtures_dir.cleanup)
+        ApiResponseCache(fixtures_dir.name).set('equipment/club', self.CLUB)
+
+        server = SrdStandInServer(('127.0.0.1', 0), fixtures_dir.name, **options)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def api_client(self, server, **options):
+        options.setdefault('backoff', 0)
+        options.setdefault('rate_limit', 0)
+        client = DndApiClient(base_url=f'http://127.0.0.1:{server.server_port}/api/2014', cache_dir='', **options)
+        self.addCleanup(client.session.close)
+        return client
+
+    def test_retries_service_unavailable(self):
+        server = self.start_server(error_rate=0.5)
+        client = self.api_client(server, max_retries=3)
+        with mock.patch('DnDSite.srd_standin.random.random', side_effect=[0.1, 0.1, 0.9]), \
+                self.assertLogs('DnDSite.utils', 'WARNING') as logs:
+            self.assertEqual(client.get_equipment_detail('club'), self.CLUB)
+        self.assertEqual(server.requests_total, 3)
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn('503', logs.records[0].getMessage())
+
+    def test_gives_up_after_max_retries(self):
+        server = self.start_server(error_rate=1.0)
+        client = self.api_client(server, max_retries=2)
+        with self.assertLogs('DnDSite.utils', 'WARNING'):
+            self.assertIsNone(client.get_equipment_detail('club'))
+        self.assertEqual(server.requests_total, 3)
+
+    def test_honours_retry_after(self):
+        server = self.start_server(max_rps=1)
+        client = self.api_client(server, max_retries=1)
+        self.assertEqual(client.get_equipment_detail('club'), self.CLUB)
+
+        real_sleep = time.sleep
+        with mock.patch('DnDSite.utils.time.sleep', side_effect=real_sleep) as sleep, \
+                self.assertLogs('DnDSite.utils', 'WARNING'):
+            self.assertEqual(client.get_equipment_detail('club'), self.CLUB)
+        self.assertIn(mock.call(1.0), sleep.call_args_list)
+        self.assertEqual(server.requests_total, 3)
+
+    def test_limiter_halves_after_throttling(self):
+        server = self.start_server(max_rps=1)
+        client = self.api_client(server, max_retries=0, rate_limit=8, pool_size=4)
+        self.assertEqual(client.get_equipment_detail('club'), self.CLUB)
+        self.assertEqual(client.rate_limiter.stats(), {'rate': 8, 'concurrency': 4, 'throttled': 0})
+
+        with self.assertLogs('DnDSite.utils', 'ERROR'):
+            self.assertIsNone(client.get_equipment_detail('club'))
+        self.assertEqual(client.rate_limiter.stats(), {'rate': 4, 'concurrency': 2, 'throttled': 1})
@@ -6,10 +6,12 @@ from .views.spell_views import *
 from .views.equipment_views import *
 from .views.admin_views import *
 from .views.favorite_views import *
-from .views.utils_views import monster_filter_api
+from .views.search_views import search
+from .views.utils_views import monster_filter_api, autocomplete_api, similar_monsters, similar_spells, similar_equipment
 
 urlpatterns = [
     path('', index, name='index'),
+    path('search/', search, name='search'),
 
     path('login/', custom_login, name='login'),
     path('register/', register, name='register'),
@@ -17,18 +19,21 @@ urlpatterns = [
     path('admin/login/redirect/', admin_login_redirect, name='admin_login_redirect'),
 
     path('monsters/', monster_list, name='monster_list'),
+    path('monsters/<int:monster_id>/similar/', similar_monsters, name='similar_monsters'),
     path('monsters/<int:monster_id>/', monster_detail, name='monster_detail'),
     path('monsters/add/', add_monster, name='add_monster'),
     path('monsters/<int:monster_id>/edit/', edit_monster, name='edit_monster'),
     path('monsters/<int:monster_id>/delete/', delete_monster, name='delete_monster'),
 
     path('spells/', spell_list, name='spell_list'),
+    path('spells/<int:spell_id>/similar/', similar_spells, name='similar_spells'),
     path('spells/<int:spell_id>/', spell_detail, name='spell_detail'),
     path('spells/add/', add_spell, name='add_spell'),
     path('spells/<int:spell_id>/edit/', edit_spell, name='edit_spell'),
     path('spells/<int:spell_id>/delete/', delete_spell, name='delete_spell'),
 
     path('equipment/', equipment_list, name='equipment_list'),
+    path('equipment/<int:equipment_id>/similar/', similar_equipment, name='similar_equipment'),
     path('equipment/<int:equipment_id>/', equipment_detail, name='equipment_detail'),
     path('equipment/add/', add_equipment, name='add_equipment'),
     path('equipment/<int:equipment_id>/edit/', edit_equipment, name='edit_equipment'),
@@ -47,4 +52,5 @@ urlpatterns = [
          check_favorite, name='check_favorite'),
 
     path('api/monsters/filter/', monster_filter_api, name='monster_filter_api'),
+    path('api/autocomplete/', autocomplete_api, name='autocomplete_api'),
 ]
\ No newline at end of file
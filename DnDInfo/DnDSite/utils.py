@@ -1,27 +1,226 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
 import requests
 from django.conf import settings
+from django.db import transaction
+from requests.adapters import HTTPAdapter
 
 from .constants import SCHOOL_MAPPING, COMPONENT_MAPPING
-from .models import Monster, Spell, Equipment, Armor_class, Speed, Component
+from .models import Monster, Spell, Equipment, Armor_class, Speed, Component, ImportedRecord, ImportCheckpoint
+from .indexing import DerivedIndexes
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class ApiResponseCache:
+    def __init__(self, cache_dir, max_age=0):
+        self.cache_dir = Path(cache_dir)
+        self.max_age = max_age
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(endpoint):
+        return hashlib.sha1(endpoint.strip('/').encode('utf-8')).hexdigest()
+
+    def _path(self, endpoint):
+        return self.cache_dir / f'{self.key(endpoint)}.json'
+
+    def get(self, endpoint):
+        try:
+            with open(self._path(endpoint), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, endpoint, data, etag=None, last_modified=None):
+        entry = {
+            'endpoint': endpoint.strip('/'),
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': time.time(),
+            'data': data,
+        }
+        path = self._path(endpoint)
+        tmp_path = path.with_suffix(f'.{threading.get_ident()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def is_fresh(self, entry):
+        return time.time() - entry.get('fetched_at', 0) < self.max_age
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, rate, max_concurrency, target_latency, min_rate=0.5):
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.refilled_at = time.monotonic()
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+        self.target_latency = target_latency
+        self.active = 0
+        self.throttled = 0
+        self.condition = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+    def acquire(self):
+        with self.condition:
+            while self.active >= int(self.concurrency):
+                self.condition.wait()
+            self.active += 1
+
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                self.condition.wait((1 - self.tokens) / self.rate)
+
+    def release(self, latency, throttled=False):
+        with self.condition:
+            self.active -= 1
+            if throttled:
+                self.throttled += 1
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.concurrency = max(1.0, self.concurrency / 2)
+            elif latency > self.target_latency:
+                self.concurrency = max(1.0, self.concurrency * 0.9)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+                self.concurrency = min(float(self.max_concurrency), self.concurrency + 1 / self.concurrency)
+            self.condition.notify_all()
+
+    def stats(self):
+        with self.condition:
+            return {
+                'rate': self.rate,
+                'concurrency': int(self.concurrency),
+                'throttled': self.throttled,
+            }
+
+
 class DndApiClient:
-    def __init__(self):
-        self.base_url = settings.DND_API_URL
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, pool_size=None, max_retries=None, backoff=None, cache_dir=None, offline=None,
+                 base_url=None, rate_limit=None):
+        self.base_url = (base_url or settings.DND_API_URL).rstrip('/')
+        self.timeout = settings.DND_API_TIMEOUT
+        self.max_retries = settings.DND_API_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = settings.DND_API_BACKOFF if backoff is None else backoff
+        self.offline = settings.DND_API_OFFLINE if offline is None else offline
+        pool_size = pool_size or settings.DND_API_POOL_SIZE
+        cache_dir = settings.DND_API_CACHE_DIR if cache_dir is None else cache_dir
+        self.cache = ApiResponseCache(cache_dir, settings.DND_API_CACHE_MAX_AGE) if cache_dir else None
+        rate_limit = settings.DND_API_RATE_LIMIT if rate_limit is None else rate_limit
+        self.rate_limiter = AdaptiveRateLimiter(
+            rate_limit, pool_size, settings.DND_API_TARGET_LATENCY
+        ) if rate_limit else None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _retry_delay(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        delay = self.backoff * (2 ** attempt)
+        return delay + random.uniform(0, delay)
+
+    def _send(self, url, headers):
+        if not self.rate_limiter:
+            return self.session.get(url, headers=headers, timeout=self.timeout)
+
+        self.rate_limiter.acquire()
+        started = time.monotonic()
+        throttled = False
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            throttled = response.status_code == 429
+            return response
+        finally:
+            self.rate_limiter.release(time.monotonic() - started, throttled)
+
+    def _get(self, url, headers):
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self._send(url, headers)
+                if response.status_code in self.RETRY_STATUSES and attempt < self.max_retries:
+                    logger.warning(f"Статус {response.status_code} от {url}, повтор {attempt + 1}/{self.max_retries}")
+                    time.sleep(self._retry_delay(attempt, response))
+                    continue
+                if response.status_code != 304:
+                    response.raise_for_status()
+                return response
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt < self.max_retries:
+                    logger.warning(f"Сбой соединения с {url}: {e}, повтор {attempt + 1}/{self.max_retries}")
+                    time.sleep(self._retry_delay(attempt))
+                    continue
+                logger.error(f"Ошибка при запросе к {url}: {e}")
+                return None
+            except requests.RequestException as e:
+                logger.error(f"Ошибка при запросе к {url}: {e}")
+                return None
+        return None
 
     def _make_request(self, endpoint):
-        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        endpoint = endpoint.strip('/')
+        url = f"{self.base_url}/{endpoint}"
+        cached = self.cache.get(endpoint) if self.cache else None
+
+        if cached and (self.offline or self.cache.is_fresh(cached)):
+            return cached['data']
+        if self.offline:
+            logger.error(f"Нет сохранённого ответа для {endpoint} в офлайн-режиме")
+            return None
+
+        headers = {}
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+        response = self._get(url, headers)
+        if response is None:
+            if cached:
+                logger.warning(f"Используется устаревший ответ из кэша для {endpoint}")
+                return cached['data']
+            return None
+
+        if response.status_code == 304 and cached:
+            self.cache.set(endpoint, cached['data'], cached.get('etag'), cached.get('last_modified'))
+            return cached['data']
+
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            logger.error(f"Ошибка при запросе к {url}: {e}")
+            data = response.json()
+        except ValueError as e:
+            logger.error(f"Некорректный ответ от {url}: {e}")
             return None
 
+        if self.cache:
+            self.cache.set(endpoint, data, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return data
+
     def get_monsters_list(self):
         data = self._make_request('monsters')
         return data.get('results', []) if data else []
@@ -45,195 +244,420 @@ class DndApiClient:
 
 
 class DataImporter:
-    def __init__(self):
-        self.api_client = DndApiClient()
-
-    def import_monster(self, index):
-        data = self.api_client.get_monster_detail(index)
-        if not data:
-            return None
+    ENTITY_MODELS = {
+        'monster': Monster,
+        'spell': Spell,
+        'equipment': Equipment,
+    }
+
+    def __init__(self, api_client=None):
+        self.api_client = api_client or DndApiClient()
+
+    def fetch_details(self, fetch, indexes, workers=1):
+        if workers <= 1:
+            for index in indexes:
+                yield index, fetch(index)
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            yield from zip(indexes, executor.map(fetch, indexes))
+
+    def _entity_handlers(self, entity_type):
+        handlers = {
+            'monster': (self.api_client.get_monster_detail, self.parse_monster, self.save_monsters),
+            'spell': (self.api_client.get_spell_detail, self.parse_spell, self.save_spells),
+            'equipment': (self.api_client.get_equipment_detail, self.parse_equipment, self.save_equipment),
+        }
+        return handlers[entity_type]
+
+    @staticmethod
+    def content_hash(data):
+        return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def import_many(self, entity_type, indexes, workers=1, batch_size=100, sync=False, resume=False):
+        get_detail, parse, save = self._entity_handlers(entity_type)
+        stats = Counter()
+        batch = []
+
+        checkpoints = ImportCheckpoint.objects.filter(content_type=entity_type)
+        if resume:
+            completed = set(checkpoints.values_list('source_index', flat=True))
+            stats['resumed'] = sum(1 for index in indexes if index in completed)
+            indexes = [index for index in indexes if index not in completed]
+        else:
+            checkpoints.delete()
 
         try:
-            monster, created = Monster.objects.get_or_create(
-                name=data['name'],
-                defaults={
-                    'size': data.get('size', 'Medium'),
-                    'type': data.get('type', 'humanoid'),
-                    'hit_points': data.get('hit_points', 0),
-                    'strength': data.get('strength', 10),
-                    'dexterity': data.get('dexterity', 10),
-                    'constitution': data.get('constitution', 10),
-                    'intelligence': data.get('intelligence', 10),
-                    'wisdom': data.get('wisdom', 10),
-                    'charisma': data.get('charisma', 10),
-                    'is_homebrew': False,
-                    'is_approved': True,
-                }
+            for index, data in self.fetch_details(get_detail, indexes, workers):
+                if not data:
+                    stats['failed'] += 1
+                    continue
+                try:
+                    record = parse(data)
+                except Exception as e:
+                    logger.error(f"Ошибка при разборе {entity_type} {index}: {e}")
+                    stats['failed'] += 1
+                    continue
+                record['index'] = index
+                record['hash'] = self.content_hash(data)
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    stats.update(self._save_batch(entity_type, save, batch, sync, checkpoint=True))
+                    batch = []
+        except KeyboardInterrupt:
+            if batch:
+                self._save_batch(entity_type, save, batch, sync, checkpoint=True)
+            raise
+
+        if batch:
+            stats.update(self._save_batch(entity_type, save, batch, sync, checkpoint=True))
+        return stats
+
+    def import_records(self, entity_type, records, sync=False):
+        save = self._entity_handlers(entity_type)[2]
+        return self._save_batch(entity_type, save, records, sync)
+
+    def _save_batch(self, entity_type, save, batch, sync=False, checkpoint=False):
+        try:
+            with transaction.atomic():
+                return self._save_records(entity_type, save, batch, sync, checkpoint)
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении пакета {entity_type} ({len(batch)} записей): {e}")
+            return Counter(failed=len(batch))
+
+    def _save_records(self, entity_type, save, records, sync, checkpoint=False):
+        model = self.ENTITY_MODELS[entity_type]
+        known = {
+            imported.source_index: imported
+            for imported in ImportedRecord.objects.filter(
+                content_type=entity_type,
+                source_index__in=[record['index'] for record in records if record.get('index')]
+            )
+        }
+        alive = set(
+            model.objects.filter(id__in=[imported.object_id for imported in known.values()]).values_list('id', flat=True)
+        )
+
+        if checkpoint:
+            ImportCheckpoint.objects.bulk_create(
+                [
+                    ImportCheckpoint(content_type=entity_type, source_index=record['index'])
+                    for record in records if record.get('index')
+                ],
+                ignore_conflicts=True,
             )
 
-            armor_data = data.get('armor_class', [])
-            if isinstance(armor_data, list):
-                for ac in armor_data:
-                    Armor_class.objects.get_or_create(
-                        monster=monster,
-                        type=ac.get('type', 'natural'),
-                        defaults={'value': ac.get('value', 10)}
-                    )
-            elif isinstance(armor_data, int):
-                Armor_class.objects.get_or_create(
-                    monster=monster,
-                    type='natural',
-                    defaults={'value': armor_data}
+        stats = Counter()
+        pending = []
+        for record in records:
+            imported = known.get(record.get('index'))
+            if imported and imported.object_id in alive:
+                if imported.content_hash == record['hash']:
+                    stats['unchanged'] += 1
+                    continue
+                record['object_id'] = imported.object_id
+            pending.append(record)
+
+        if not pending:
+            return stats
+
+        save(pending, update=sync)
+        self._index_records(entity_type, pending)
+        tracked = {}
+        for record in pending:
+            stats[record['status']] += 1
+            untracked = record['status'] == 'existing' and not record.get('object_id')
+            if record.get('index') and (record['status'] in ('inserted', 'updated') or untracked):
+                tracked[record['index']] = ImportedRecord(
+                    content_type=entity_type,
+                    source_index=record['index'],
+                    object_id=record['object'].id,
+                    content_hash='' if untracked else record['hash'],
                 )
-            speed_data = data.get('speed', {})
-            for movement_type, value in speed_data.items():
-                if value:
-                    Speed.objects.get_or_create(
-                        monster=monster,
-                        movement_type=movement_type,
-                        defaults={'value': str(value)}
-                    )
-
-            return monster
-
-        except Exception as e:
-            logger.error(f"Ошибка при импорте монстра {index}: {e}")
-            return None
-
-    def import_spell(self, index):
-        data = self.api_client.get_spell_detail(index)
+        ImportedRecord.objects.bulk_create(
+            tracked.values(),
+            update_conflicts=True,
+            unique_fields=['content_type', 'source_index'],
+            update_fields=['object_id', 'content_hash', 'updated_at'],
+        )
+        return stats
+
+    def _import_one(self, entity_type, index, data):
+        get_detail, parse, save = self._entity_handlers(entity_type)
+        if data is None:
+            data = get_detail(index)
         if not data:
             return None
 
         try:
-            school_data = data.get('school', {})
-            school_key = school_data.get('index', '')
-            school_mapping = SCHOOL_MAPPING
-            school = school_mapping.get(school_key, 'abjuration')
-            desc = ' '.join(data.get('desc', [])) if isinstance(data.get('desc'), list) else data.get('desc', '')
-
-            spell, created = Spell.objects.get_or_create(
-                name=data['name'],
-                defaults={
-                    'desc': desc[:1000],
-                    'spell_range': data.get('range', ''),
-                    'duration': data.get('duration', ''),
-                    'casting_time': data.get('casting_time', ''),
-                    'level': data.get('level', 0),
-                    'school': school,
-                    'ritual': data.get('ritual', False),
-                    'concentration': data.get('concentration', False),
-                    'is_homebrew': False,
-                    'is_approved': True,
-                }
-            )
-            components = data.get('components', [])
-            component_mapping = COMPONENT_MAPPING
-
-            for comp in components:
-                comp_type = component_mapping.get(comp, 'V')
-                Component.objects.get_or_create(
-                    spell=spell,
-                    type=comp_type
-                )
-
-            return spell
-
+            with transaction.atomic():
+                record = parse(data)
+                save([record])
+                self._index_records(entity_type, [record])
+                return record['object']
         except Exception as e:
-            logger.error(f"Ошибка при импорте заклинания {index}: {e}")
+            logger.error(f"Ошибка при импорте {entity_type} {index}: {e}")
             return None
 
-    def import_equipment(self, index):
-        data = self.api_client.get_equipment_detail(index)
-        if not data:
-            return None
-        try:
-            cost_data = data.get('cost', {})
-            cost_quantity = cost_data.get('quantity', 0)
-            cost_unit = cost_data.get('unit', 'gp')
-            description_parts = []
-            if 'desc' in data and data['desc']:
-                if isinstance(data['desc'], list):
-                    description_parts.extend(data['desc'])
-                else:
-                    description_parts.append(str(data['desc']))
-            if 'properties' in data and data['properties']:
-                prop_names = []
-                for prop in data.get('properties', []):
-                    if 'name' in prop:
-                        prop_names.append(prop['name'])
-                if prop_names:
-                    description_parts.append(f"Свойства: {', '.join(prop_names)}")
-            if 'equipment_category' in data:
-                category_data = data['equipment_category']
-                if 'name' in category_data:
-                    description_parts.append(f"Категория: {category_data['name']}")
-            if 'weapon_category' in data:
-                description_parts.append(f"Тип оружия: {data['weapon_category']}")
-            if 'armor_category' in data:
-                description_parts.append(f"Тип доспеха: {data['armor_category']}")
-            if 'special' in data and data['special']:
-                description_parts.append(f"Особое свойство: {data['special']}")
-            if 'damage' in data and 'damage_dice' in data['damage']:
-                damage_dice = data['damage']['damage_dice']
-                damage_type = data['damage']['damage_type']['name'] if 'damage_type' in data['damage'] else ''
-                description_parts.append(f"Урон: {damage_dice} ({damage_type})")
-            if 'range' in data and 'normal' in data['range']:
-                description_parts.append(f"Дальность: {data['range']['normal']} футов")
-            if 'armor_class' in data and 'base' in data['armor_class']:
-                description_parts.append(f"Класс брони: {data['armor_class']['base']}")
-            if 'weight' in data and data['weight']:
-                description_parts.append(f"Вес: {data['weight']} фунтов")
-            description = ' | '.join(description_parts) if description_parts else None
-            if description and len(description) > 2000:
-                description = description[:1997] + '...'
-            equipment, created = Equipment.objects.get_or_create(
-                name=data['name'],
-                is_homebrew=False,
-                defaults={
-                    'description': description,
-                    'weight': data.get('weight', 0),
-                    'cost_quantity': cost_quantity,
-                    'cost_unit': cost_unit,
-                    'is_approved': True,
-                }
+    def import_monster(self, index, data=None):
+        return self._import_one('monster', index, data)
+
+    def import_spell(self, index, data=None):
+        return self._import_one('spell', index, data)
+
+    def import_equipment(self, index, data=None):
+        return self._import_one('equipment', index, data)
+
+    def parse_monster(self, data):
+        armor_classes = []
+        armor_data = data.get('armor_class', [])
+        if isinstance(armor_data, list):
+            for ac in armor_data:
+                armor_classes.append((ac.get('type', 'natural'), ac.get('value', 10)))
+        elif isinstance(armor_data, int):
+            armor_classes.append(('natural', armor_data))
+
+        speeds = []
+        for movement_type, value in data.get('speed', {}).items():
+            if value:
+                speeds.append((movement_type, str(value)))
+
+        return {
+            'fields': {
+                'name': data['name'],
+                'size': data.get('size', 'Medium'),
+                'type': data.get('type', 'humanoid'),
+                'hit_points': data.get('hit_points', 0),
+                'strength': data.get('strength', 10),
+                'dexterity': data.get('dexterity', 10),
+                'constitution': data.get('constitution', 10),
+                'intelligence': data.get('intelligence', 10),
+                'wisdom': data.get('wisdom', 10),
+                'charisma': data.get('charisma', 10),
+                'is_homebrew': False,
+                'is_approved': True,
+            },
+            'armor_classes': armor_classes,
+            'speeds': speeds,
+        }
+
+    def parse_spell(self, data):
+        school_data = data.get('school', {})
+        school_key = school_data.get('index', '')
+        school = SCHOOL_MAPPING.get(school_key, 'abjuration')
+        desc = ' '.join(data.get('desc', [])) if isinstance(data.get('desc'), list) else data.get('desc', '')
+        components = [COMPONENT_MAPPING.get(comp, 'V') for comp in data.get('components', [])]
+
+        return {
+            'fields': {
+                'name': data['name'],
+                'desc': desc[:1000],
+                'spell_range': data.get('range', ''),
+                'duration': data.get('duration', ''),
+                'casting_time': data.get('casting_time', ''),
+                'level': data.get('level', 0),
+                'school': school,
+                'ritual': data.get('ritual', False),
+                'concentration': data.get('concentration', False),
+                'is_homebrew': False,
+                'is_approved': True,
+            },
+            'components': components,
+        }
+
+    def parse_equipment(self, data):
+        cost_data = data.get('cost', {})
+        cost_quantity = cost_data.get('quantity', 0)
+        cost_unit = cost_data.get('unit', 'gp')
+        description_parts = []
+        if 'desc' in data and data['desc']:
+            if isinstance(data['desc'], list):
+                description_parts.extend(data['desc'])
+            else:
+                description_parts.append(str(data['desc']))
+        if 'properties' in data and data['properties']:
+            prop_names = []
+            for prop in data.get('properties', []):
+                if 'name' in prop:
+                    prop_names.append(prop['name'])
+            if prop_names:
+                description_parts.append(f"Свойства: {', '.join(prop_names)}")
+        if 'equipment_category' in data:
+            category_data = data['equipment_category']
+            if 'name' in category_data:
+                description_parts.append(f"Категория: {category_data['name']}")
+        if 'weapon_category' in data:
+            description_parts.append(f"Тип оружия: {data['weapon_category']}")
+        if 'armor_category' in data:
+            description_parts.append(f"Тип доспеха: {data['armor_category']}")
+        if 'special' in data and data['special']:
+            description_parts.append(f"Особое свойство: {data['special']}")
+        if 'damage' in data and 'damage_dice' in data['damage']:
+            damage_dice = data['damage']['damage_dice']
+            damage_type = data['damage']['damage_type']['name'] if 'damage_type' in data['damage'] else ''
+            description_parts.append(f"Урон: {damage_dice} ({damage_type})")
+        if 'range' in data and 'normal' in data['range']:
+            description_parts.append(f"Дальность: {data['range']['normal']} футов")
+        if 'armor_class' in data and 'base' in data['armor_class']:
+            description_parts.append(f"Класс брони: {data['armor_class']['base']}")
+        if 'weight' in data and data['weight']:
+            description_parts.append(f"Вес: {data['weight']} фунтов")
+        description = ' | '.join(description_parts) if description_parts else None
+        if description and len(description) > 2000:
+            description = description[:1997] + '...'
+
+        return {
+            'fields': {
+                'name': data['name'],
+                'description': description,
+                'weight': data.get('weight', 0),
+                'cost_quantity': cost_quantity,
+                'cost_unit': cost_unit,
+                'is_homebrew': False,
+                'is_approved': True,
+            },
+        }
+
+    def _save_parents(self, model, records, update=False):
+        names = [record['fields']['name'] for record in records]
+        by_name = {obj.name: obj for obj in model.objects.filter(name__in=names, is_homebrew=False)}
+        by_id = model.objects.in_bulk([record['object_id'] for record in records if record.get('object_id')])
+
+        new_objects = {}
+        updated = {}
+        for record in records:
+            fields = record['fields']
+            obj = by_id.get(record.get('object_id')) or by_name.get(fields['name'])
+            if obj is None and fields['name'] in new_objects:
+                record['object'] = new_objects[fields['name']]
+                record['status'] = 'existing'
+            elif obj is None:
+                record['object'] = new_objects[fields['name']] = model(**fields)
+                record['object'].update_search_fields()
+                record['status'] = 'inserted'
+            elif update and obj.id not in updated:
+                for field, value in fields.items():
+                    setattr(obj, field, value)
+                obj.update_search_fields()
+                record['object'] = updated[obj.id] = obj
+                record['status'] = 'updated'
+            else:
+                record['object'] = obj
+                record['status'] = 'existing'
+
+        model.objects.bulk_create(new_objects.values())
+        if updated:
+            model.objects.bulk_update(
+                updated.values(), [*records[0]['fields'], 'search_name', 'search_text']
             )
-            if not created and not equipment.description and description:
-                equipment.description = description
-                equipment.save()
-                self.stdout.write(f"  ⚡ Обновлено описание для: {equipment.name}")
-
-            return equipment
-
-        except Exception as e:
-            logger.error(f"Ошибка при импорте снаряжения {index}: {e}")
-            return None
 
-    def update_equipment_descriptions(self, limit=50):
-        from .models import Equipment
-        import re
+        if any(obj.pk is None for obj in new_objects.values()):
+            saved = {obj.name: obj for obj in model.objects.filter(name__in=list(new_objects), is_homebrew=False)}
+            for record in records:
+                if record['object'].pk is None:
+                    record['object'] = saved[record['object'].name]
+
+        return list(updated)
+
+    def save_monsters(self, records, update=False):
+        updated_ids = self._save_parents(Monster, records, update)
+        Armor_class.objects.filter(monster_id__in=updated_ids).delete()
+        Speed.objects.filter(monster_id__in=updated_ids).delete()
+
+        monster_ids = [record['object'].id for record in records]
+        existing_armor = set(
+            Armor_class.objects.filter(monster_id__in=monster_ids).values_list('monster_id', 'type')
+        )
+        existing_speeds = set(
+            Speed.objects.filter(monster_id__in=monster_ids).values_list('monster_id', 'movement_type')
+        )
+        new_armor = {}
+        new_speeds = {}
+        for record in records:
+            monster = record['object']
+            for armor_type, value in record['armor_classes']:
+                key = (monster.id, armor_type)
+                if key not in existing_armor and key not in new_armor:
+                    new_armor[key] = Armor_class(monster=monster, type=armor_type, value=value)
+            for movement_type, value in record['speeds']:
+                key = (monster.id, movement_type)
+                if key not in existing_speeds and key not in new_speeds:
+                    new_speeds[key] = Speed(monster=monster, movement_type=movement_type, value=value)
+
+        Armor_class.objects.bulk_create(new_armor.values())
+        Speed.objects.bulk_create(new_speeds.values())
+        return [record['object'] for record in records]
+
+    def save_spells(self, records, update=False):
+        updated_ids = self._save_parents(Spell, records, update)
+        Component.objects.filter(spell_id__in=updated_ids).delete()
+
+        components = [
+            Component(spell=record['object'], type=comp_type)
+            for record in records
+            for comp_type in record['components']
+        ]
+        Component.objects.bulk_create(components, ignore_conflicts=True)
+        return [record['object'] for record in records]
+
+    def save_equipment(self, records, update=False):
+        self._save_parents(Equipment, records, update)
+
+        missing_descriptions = {}
+        for record in records:
+            item = record['object']
+            description = record['fields']['description']
+            if not item.description and description:
+                item.description = description
+                item.update_search_fields()
+                missing_descriptions[item.id] = item
+                logger.info(f"Обновлено описание для: {item.name}")
+        Equipment.objects.bulk_update(missing_descriptions.values(), ['description', 'search_text'])
+        return [record['object'] for record in records]
+
+    @staticmethod
+    def _index_records(entity_type, records):
+        DerivedIndexes.saved(entity_type, [record['object'] for record in records])
+
+    @staticmethod
+    def normalize_name(name):
+        return re.sub(r'[^\w\s-]', '', name.lower())
+
+    def update_equipment_descriptions(self, limit=50, workers=1, progress=None):
         equipment_to_update = Equipment.objects.filter(
             description__isnull=True,
             is_homebrew=False
         )[:limit]
 
-        updated_count = 0
-
+        name_to_index = {
+            self.normalize_name(item['name']): item['index']
+            for item in self.api_client.get_equipment_list()
+        }
+        wanted = {}
         for equipment in equipment_to_update:
+            index = name_to_index.get(self.normalize_name(equipment.name))
+            if index:
+                wanted.setdefault(index, []).append(equipment)
+
+        updated = []
+        fetched = self.fetch_details(self.api_client.get_equipment_detail, list(wanted), workers)
+        for processed, (index, data) in enumerate(fetched, 1):
+            if progress:
+                progress(processed, len(wanted), index)
+            if not data:
+                continue
             try:
-                equipment_list = self.api_client.get_equipment_list()
-
-                for item in equipment_list:
-                    api_name = re.sub(r'[^\w\s-]', '', item['name'].lower())
-                    db_name = re.sub(r'[^\w\s-]', '', equipment.name.lower())
-
-                    if api_name == db_name:
-                        updated = self.import_equipment(item['index'])
-                        if updated:
-                            updated_count += 1
-                        break
-
+                description = self.parse_equipment(data)['fields']['description']
             except Exception as e:
-                logger.error(f"Ошибка при обновлении {equipment.name}: {e}")
-
-        return updated_count
\ No newline at end of file
+                logger.error(f"Ошибка при обновлении {index}: {e}")
+                continue
+            if description:
+                for equipment in wanted[index]:
+                    equipment.description = description
+                    equipment.update_search_fields()
+                    updated.append(equipment)
+
+        with transaction.atomic():
+            Equipment.objects.bulk_update(updated, ['description', 'search_text'], batch_size=500)
+            DerivedIndexes.saved('equipment', updated)
+        return len(updated)
\ No newline at end of file
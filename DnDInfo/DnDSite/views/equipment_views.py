@@ -1,9 +1,7 @@
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.core.paginator import Paginator
-from django.db.models import Q
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
-from ..services import EquipmentService
+from ..services import CatalogListService
 from .base_views import is_admin
 from ..constants import WEIGHT_OPTIONS, CURRENCY_UNITS, SORT_OPTIONS_EQUIPMENTS
 from ..forms import EquipmentForm, EquipmentEditForm
@@ -11,77 +9,12 @@ from ..models import Equipment
 
 
 def equipment_list(request):
-    show_homebrew = request.GET.get('show_homebrew', 'false') == 'true'
-
-    if show_homebrew:
-        equipment_list = Equipment.objects.filter(is_homebrew=True, is_approved=True)
-    else:
-        equipment_list = Equipment.objects.filter(is_homebrew=False)
-
-    search_query = request.GET.get('search', '').strip()
-    cost_unit = request.GET.get('cost_unit', '')
-    weight_filter = request.GET.get('weight_filter', '')
-    sort_by = request.GET.get('sort', 'name')
-
-    if search_query:
-        search_terms = search_query.split()
-        query = Q()
-
-        for term in search_terms:
-            if term:
-                term_lower = term.lower()
-                term_upper = term.upper()
-                term_title = term.title()
-
-                query |= Q(name__icontains=term)
-
-                query |= Q(name__icontains=term_lower)
-                query |= Q(name__icontains=term_upper)
-                query |= Q(name__icontains=term_title)
-
-                query |= Q(description__icontains=term)
-                query |= Q(description__icontains=term_lower)
-                query |= Q(description__icontains=term_upper)
-                query |= Q(description__icontains=term_title)
-
-        equipment_list = equipment_list.filter(query).distinct()
-
-        if equipment_list.count() == 0 and search_terms:
-            from django.db.models.functions import Lower
-            equipment_list_tmp = equipment_list.annotate(
-                name_lower=Lower('name'),
-                description_lower=Lower('description')
-            )
-
-            query_lower = Q()
-            for term in search_terms:
-                term_lower = term.lower()
-                query_lower |= Q(name_lower__icontains=term_lower)
-                query_lower |= Q(description_lower__icontains=term_lower)
-
-            equipment_list = equipment_list_tmp.filter(query_lower)
-
-    if cost_unit:
-        equipment_list = equipment_list.filter(cost_unit=cost_unit)
-
-    if weight_filter:
-        if weight_filter == 'light':
-            equipment_list = equipment_list.filter(weight__lt=5)
-        elif weight_filter == 'medium':
-            equipment_list = equipment_list.filter(weight__range=(5, 15))
-        elif weight_filter == 'heavy':
-            equipment_list = equipment_list.filter(weight__gt=15)
-
-    if sort_by == 'name':
-        equipment_list = equipment_list.order_by('name')
-    elif sort_by == 'weight_asc':
-        equipment_list = equipment_list.order_by('weight')
-    elif sort_by == 'weight_desc':
-        equipment_list = equipment_list.order_by('-weight')
-    elif sort_by == 'price_asc':
-        equipment_list = equipment_list.order_by('cost_quantity')
-    elif sort_by == 'price_desc':
-        equipment_list = equipment_list.order_by('-cost_quantity')
+    params = CatalogListService.params_from_request('equipment', request)
+    search_query = params['search']
+    show_homebrew = params['show_homebrew']
+    cost_unit = params['cost_unit']
+    weight_filter = params['weight_filter']
+    sort_by = params['sort']
 
     currency_options = CURRENCY_UNITS
 
@@ -94,14 +27,11 @@ def equipment_list(request):
     if show_homebrew:
         reset_url = f"{request.path}?show_homebrew=true"
 
-    paginator = Paginator(equipment_list, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    listing = CatalogListService.get_page('equipment', params, request.GET.get('page'), request.GET.get('cursor'))
 
     context = {
-        'page_obj': page_obj,
-        'equipment': page_obj.object_list,
-        'total_count': equipment_list.count(),
+        **listing,
+        'equipment': listing['page_obj'].object_list,
         'search_query': search_query,
         'selected_cost_unit': cost_unit,
         'selected_weight_filter': weight_filter,
@@ -118,7 +48,6 @@ def equipment_list(request):
 
 def equipment_detail(request, equipment_id):
     equipment = get_object_or_404(Equipment, id=equipment_id)
-    similar_equipment = EquipmentService.get_similar_equipment(equipment, limit=3)
     if equipment.cost_quantity:
         cost_display = f"{equipment.cost_quantity} {equipment.get_cost_unit_display()}"
     else:
@@ -128,7 +57,6 @@ def equipment_detail(request, equipment_id):
         'equipment': equipment,
         'cost_display': cost_display,
         'can_edit': request.user.is_staff or (request.user == equipment.created_by and not equipment.is_homebrew),
-        'similar_equipment': similar_equipment,
     }
     return render(request, 'DnDSite/equipment_detail.html', context)
 
@@ -1,9 +1,8 @@
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.core.paginator import Paginator
 from django.db import transaction
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
-from ..services import MonsterService
+from ..services import CatalogListService
 from ..constants import SORT_OPTIONS, TYPE_OPTIONS, SIZE_OPTIONS
 from ..forms import MonsterSpeedsForm, ArmorClassForm, MonsterForm, MonsterEditForm
 from ..models import Monster, Armor_class, Speed
@@ -11,74 +10,12 @@ from .base_views import is_admin
 
 
 def monster_list(request):
-    search_query = request.GET.get('search', '').strip()
-    show_homebrew = request.GET.get('show_homebrew', 'false') == 'true'
-    selected_size = request.GET.get('size', '')
-    selected_type = request.GET.get('type', '')
-    sort_by = request.GET.get('sort', 'name')
-    if show_homebrew:
-        monsters_list = Monster.objects.filter(is_homebrew=True, is_approved=True)
-    else:
-        monsters_list = Monster.objects.filter(is_homebrew=False)
-    if search_query:
-        from django.db.models import Q
-        search_terms = search_query.split()
-        query = Q()
-
-        for term in search_terms:
-            if term:
-                term_lower = term.lower()
-                term_upper = term.upper()
-                term_title = term.title()
-
-                query |= Q(name__icontains=term)
-
-                query |= Q(name__icontains=term_lower)
-                query |= Q(name__icontains=term_upper)
-                query |= Q(name__icontains=term_title)
-
-                query |= Q(type__icontains=term)
-                query |= Q(type__icontains=term_lower)
-                query |= Q(type__icontains=term_upper)
-                query |= Q(type__icontains=term_title)
-        monsters_list = monsters_list.filter(query).distinct()
-        if monsters_list.count() == 0 and search_terms:
-            from django.db.models.functions import Lower
-            monsters_list_tmp = monsters_list.annotate(
-                name_lower=Lower('name'),
-                type_lower=Lower('type')
-            )
-
-            query_lower = Q()
-            for term in search_terms:
-                term_lower = term.lower()
-                query_lower |= Q(name_lower__icontains=term_lower)
-                query_lower |= Q(type_lower__icontains=term_lower)
-
-            monsters_list = monsters_list_tmp.filter(query_lower)
-
-    if selected_size:
-        monsters_list = monsters_list.filter(size=selected_size)
-
-    if selected_type:
-        monsters_list = monsters_list.filter(type__icontains=selected_type)
-
-    if sort_by == 'hit_points':
-        monsters_list = monsters_list.order_by('-hit_points')
-    elif sort_by == 'strength':
-        monsters_list = monsters_list.order_by('-strength')
-    elif sort_by == 'dexterity':
-        monsters_list = monsters_list.order_by('-dexterity')
-    elif sort_by == 'constitution':
-        monsters_list = monsters_list.order_by('-constitution')
-    elif sort_by == 'intelligence':
-        monsters_list = monsters_list.order_by('-intelligence')
-    elif sort_by == 'wisdom':
-        monsters_list = monsters_list.order_by('-wisdom')
-    elif sort_by == 'charisma':
-        monsters_list = monsters_list.order_by('-charisma')
-    else:
-        monsters_list = monsters_list.order_by('name')
+    params = CatalogListService.params_from_request('monster', request)
+    search_query = params['search']
+    show_homebrew = params['show_homebrew']
+    selected_size = params['size']
+    selected_type = params['type']
+    sort_by = params['sort']
 
     size_options = SIZE_OPTIONS
 
@@ -102,14 +39,11 @@ def monster_list(request):
 
     sort_options = SORT_OPTIONS
 
-    paginator = Paginator(monsters_list, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    listing = CatalogListService.get_page('monster', params, request.GET.get('page'), request.GET.get('cursor'))
 
     context = {
-        'page_obj': page_obj,
-        'monsters': page_obj.object_list,
-        'total_count': monsters_list.count(),
+        **listing,
+        'monsters': listing['page_obj'].object_list,
         'search_query': search_query,
         'selected_size': selected_size,
         'selected_type': selected_type,
@@ -126,7 +60,6 @@ def monster_detail(request, monster_id):
     monster = get_object_or_404(Monster, id=monster_id)
     armor_classes = Armor_class.objects.filter(monster=monster)
     speeds = Speed.objects.filter(monster=monster)
-    similar_monsters = MonsterService.get_similar_monsters(monster, limit=3)
     def calc_mod(score):
         return (score - 10) // 2
 
@@ -141,7 +74,6 @@ def monster_detail(request, monster_id):
         'wisdom_mod': calc_mod(monster.wisdom),
         'charisma_mod': calc_mod(monster.charisma),
         'can_edit': request.user.is_staff or (request.user == monster.created_by and not monster.is_homebrew),
-        'similar_monsters': similar_monsters,
     }
 
     return render(request, 'DnDSite/monster_detail.html', context)
@@ -0,0 +1,53 @@
+from django.core.paginator import Paginator
+from django.shortcuts import render
+from django.urls import reverse
+
+from ..search import SearchResults, NameSuggester, SEARCH_MODELS
+
+SEARCH_TYPE_LABELS = {
+    'monster': 'Монстры',
+    'spell': 'Заклинания',
+    'equipment': 'Снаряжение',
+}
+
+SEARCH_DETAIL_URLS = {
+    'monster': 'monster_detail',
+    'spell': 'spell_detail',
+    'equipment': 'equipment_detail',
+}
+
+
+def search(request):
+    search_query = request.GET.get('q', '').strip()
+    content_type = request.GET.get('type', '')
+    if content_type not in SEARCH_MODELS:
+        content_type = ''
+
+    results = SearchResults(search_query, content_type or None)
+    paginator = Paginator(results, 20)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    for result in page_obj.object_list:
+        result['label'] = SEARCH_TYPE_LABELS[result['content_type']]
+        result['url'] = reverse(SEARCH_DETAIL_URLS[result['content_type']], args=[result['object_id']])
+
+    suggestions = []
+    if search_query and not paginator.count:
+        for suggestion_type in SEARCH_MODELS:
+            suggestions.extend(NameSuggester.suggest(suggestion_type, search_query, limit=1))
+
+    type_counts = [
+        (value, label, results.counts.get(value, 0))
+        for value, label in SEARCH_TYPE_LABELS.items()
+    ]
+
+    context = {
+        'page_obj': page_obj,
+        'results': page_obj.object_list,
+        'search_query': search_query,
+        'selected_type': content_type,
+        'type_counts': type_counts,
+        'total_count': results.count(),
+        'all_count': sum(results.counts.values()),
+        'suggestions': suggestions,
+    }
+    return render(request, 'DnDSite/search.html', context)
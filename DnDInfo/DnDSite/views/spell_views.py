@@ -1,10 +1,8 @@
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.core.paginator import Paginator
 from django.db import transaction
-from django.db.models import Q
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
-from ..services import SpellService
+from ..services import CatalogListService
 from ..constants import SCHOOL_CHOICES_LIST, SORT_OPTIONS_SPELLS
 from ..forms import SpellForm, SpellEditForm
 from ..models import Spell, Component
@@ -12,71 +10,14 @@ from .base_views import is_admin
 
 
 def spell_list(request):
-    search_query = request.GET.get('search', '').strip()
-    show_homebrew = request.GET.get('show_homebrew', 'false') == 'true'
-    level_filter = request.GET.get('level', '')
-    school = request.GET.get('school', '')
-    sort_by = request.GET.get('sort', 'name')
+    params = CatalogListService.params_from_request('spell', request)
+    search_query = params['search']
+    show_homebrew = params['show_homebrew']
+    level_filter = params['level']
+    school = params['school']
+    sort_by = params['sort']
 
-    if show_homebrew:
-        spells_list = Spell.objects.filter(is_homebrew=True, is_approved=True)
-    else:
-        spells_list = Spell.objects.filter(is_homebrew=False)
-
-    if level_filter and level_filter.isdigit():
-        spells_list = spells_list.filter(level=int(level_filter))
-
-    if search_query:
-        search_terms = search_query.split()
-        query = Q()
-
-        for term in search_terms:
-            if term:
-                term_lower = term.lower()
-                term_upper = term.upper()
-                term_title = term.title()
-
-                query |= Q(name__icontains=term)
-
-                query |= Q(name__icontains=term_lower)
-                query |= Q(name__icontains=term_upper)
-                query |= Q(name__icontains=term_title)
-
-                query |= Q(desc__icontains=term)
-                query |= Q(desc__icontains=term_lower)
-                query |= Q(desc__icontains=term_upper)
-                query |= Q(desc__icontains=term_title)
-
-        spells_list = spells_list.filter(query).distinct()
-
-        if spells_list.count() == 0 and search_terms:
-            from django.db.models.functions import Lower
-            spells_list_tmp = spells_list.annotate(
-                name_lower=Lower('name'),
-                desc_lower=Lower('desc')
-            )
-
-            query_lower = Q()
-            for term in search_terms:
-                term_lower = term.lower()
-                query_lower |= Q(name_lower__icontains=term_lower)
-                query_lower |= Q(desc_lower__icontains=term_lower)
-
-            spells_list = spells_list_tmp.filter(query_lower)
-
-    if school:
-        spells_list = spells_list.filter(school=school)
-
-    if sort_by == 'level':
-        spells_list = spells_list.order_by('level', 'name')
-    elif sort_by == 'school':
-        spells_list = spells_list.order_by('school', 'level', 'name')
-    else:
-        spells_list = spells_list.order_by('name')
-
-    paginator = Paginator(spells_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    listing = CatalogListService.get_page('spell', params, request.GET.get('page'), request.GET.get('cursor'))
 
     toggle_url = f"{request.path}?show_homebrew={'false' if show_homebrew else 'true'}"
 
@@ -85,8 +26,8 @@ def spell_list(request):
         reset_url = f"{request.path}?show_homebrew=true"
 
     context = {
-        'page_obj': page_obj,
-        'spells': page_obj.object_list,
+        **listing,
+        'spells': listing['page_obj'].object_list,
         'levels': range(0, 10),
         'selected_level': level_filter,
         'selected_school': school,
@@ -110,12 +51,10 @@ def spell_list(request):
 def spell_detail(request, spell_id):
     spell = get_object_or_404(Spell, id=spell_id)
     components = Component.objects.filter(spell=spell)
-    similar_spells = SpellService.get_similar_spells(spell, limit=3)
     context = {
         'spell': spell,
         'components': components,
         'can_edit': request.user.is_staff or (request.user == spell.created_by and not spell.is_homebrew),
-        'similar_spells': similar_spells,
     }
     return render(request, 'DnDSite/spell_detail.html', context)
 
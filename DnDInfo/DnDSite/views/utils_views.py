@@ -1,7 +1,14 @@
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
 from django.views.decorators.http import require_GET
 from django.db.models import Q
+from django.urls import reverse
+from ..list_cache import ListResultCache
 from ..models import Monster, Equipment, Spell
+from ..search import Autocomplete, SEARCH_MODELS
+from ..services import MonsterService, SpellService, EquipmentService
 
 
 @require_GET
@@ -36,3 +43,73 @@ def monster_filter_api(request):
         'monsters': data,
     })
 
+
+@require_GET
+def autocomplete_api(request):
+    query = request.GET.get('q', '')
+    content_type = request.GET.get('type', '')
+    if content_type and content_type not in SEARCH_MODELS:
+        return JsonResponse({'success': False, 'error': 'Неверный тип контента'}, status=400)
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 25)
+    except ValueError:
+        limit = 10
+
+    results = Autocomplete.complete(query, content_type or None, limit)
+    for result in results:
+        result['url'] = reverse(f"{result['type']}_detail", args=[result['id']])
+
+    return JsonResponse({
+        'success': True,
+        'query': query,
+        'results': results,
+    })
+
+
+SIMILAR_ITEMS = {
+    'monster': (MonsterService.get_similar_monsters, 'DnDSite/similar_monsters.html', 'similar_monsters'),
+    'spell': (SpellService.get_similar_spells, 'DnDSite/similar_spells.html', 'similar_spells'),
+    'equipment': (EquipmentService.get_similar_equipment, 'DnDSite/similar_equipment.html', 'similar_equipment'),
+}
+
+
+def _similar_items_response(request, content_type, object_id):
+    get_similar, template, context_name = SIMILAR_ITEMS[content_type]
+    try:
+        limit = min(max(int(request.GET.get('limit', 3)), 1), 10)
+    except ValueError:
+        limit = 3
+
+    def build():
+        obj = get_object_or_404(SEARCH_MODELS[content_type], id=object_id)
+        items = get_similar(obj, limit)
+        return {
+            'html': render_to_string(template, {context_name: items}),
+            'results': [
+                {'id': item.id, 'name': item.name, 'url': reverse(f'{content_type}_detail', args=[item.id])}
+                for item in items
+            ],
+        }
+
+    data = ListResultCache.cached(content_type, f'similar:{object_id}:{limit}', build)
+    if request.GET.get('format') == 'json':
+        response = JsonResponse({'success': True, 'results': data['results']})
+    else:
+        response = HttpResponse(data['html'])
+    patch_cache_control(response, public=True, max_age=60)
+    return response
+
+
+@require_GET
+def similar_monsters(request, monster_id):
+    return _similar_items_response(request, 'monster', monster_id)
+
+
+@require_GET
+def similar_spells(request, spell_id):
+    return _similar_items_response(request, 'spell', spell_id)
+
+
+@require_GET
+def similar_equipment(request, equipment_id):
+    return _similar_items_response(request, 'equipment', equipment_id)
\ No newline at end of file